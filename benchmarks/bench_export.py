@@ -0,0 +1,65 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pyxlsb import open_workbook
+from pyxlsb.export import export_sheet
+from synth import rows_for_size, write_workbook
+
+
+def naive(sheet, fp):
+  # What callers had to write before pyxlsb.export existed
+  writer = csv.writer(fp, lineterminator='\n')
+  count = 0
+  for row in sheet.rows():
+    writer.writerow([c.v for c in row])
+    count += 1
+  return count
+
+
+def run(path, fn, storage):
+  fd, out = tempfile.mkstemp(suffix='.csv')
+  os.close(fd)
+  try:
+    start = time.time()
+    with open_workbook(path, storage=storage) as wb, wb.get_sheet(1) as sheet:
+      with io.open(out, 'w', newline='', encoding='utf-8', buffering=1 << 20) as fp:
+        count = fn(sheet, fp)
+    return count, time.time() - start, os.path.getsize(out)
+  finally:
+    os.remove(out)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare the export engine against a rows() + csv loop')
+  parser.add_argument('--size', type=int, default=100, help='uncompressed sheet size in MB')
+  parser.add_argument('--cols', type=int, default=10)
+  parser.add_argument('--storage', default='file')
+  parser.add_argument('--file', help='existing .xlsb to use instead of a synthetic one')
+  args = parser.parse_args()
+
+  path = args.file
+  if path is None:
+    fd, path = tempfile.mkstemp(suffix='.xlsb')
+    os.close(fd)
+    rows = rows_for_size(args.size << 20, args.cols)
+    print('writing {} rows x {} cols to {}'.format(rows, args.cols, path))
+    write_workbook(path, [('Sheet1', rows, args.cols)])
+
+  try:
+    for name, fn in (('naive', naive), ('export', export_sheet)):
+      count, elapsed, size = run(path, fn, args.storage)
+      print('{:<8} {:>10} rows {:>8.3f}s {:>12.0f} rows/s {:>8.1f} MB/s out'.format(name, count, elapsed, count / elapsed, size / elapsed / (1 << 20)))
+  finally:
+    if args.file is None:
+      os.remove(path)
+
+
+if __name__ == '__main__':
+  main()
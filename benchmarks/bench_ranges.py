@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from zipfile import ZipFile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pyxlsb import open_workbook
+from pyxlsb.sources import LocalRangeReader, RangeFile
+from synth import rows_for_size, write_workbook
+
+
+def run(path, sheet, block_size, readahead):
+  reader = LocalRangeReader(path)
+  start = time.time()
+  count = 0
+  with RangeFile(reader, block_size=block_size, readahead=readahead) as source:
+    with open_workbook(source) as wb, wb.get_sheet(sheet) as ws:
+      for row in ws.rows(sparse=True):
+        count += 1
+  return count, time.time() - start, reader.requests, reader.bytes_read
+
+
+def fetch_bound(path, sheet, block_size, readahead):
+  # Every part but the other sheets, plus one full read-ahead run of slack for each part and the ZIP directory
+  with open_workbook(path) as wb:
+    target = wb._sheet_part(wb._sheet_index(sheet))
+  with ZipFile(path) as zf:
+    infos = zf.infolist()
+  skipped = [info for info in infos if info.filename.startswith('xl/worksheets/') and info.filename != target]
+  read = len(infos) - len(skipped)
+  return os.path.getsize(path) - sum(info.compress_size for info in skipped) + (read + 1) * readahead * block_size
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Bytes fetched through a range reader when reading one sheet')
+  parser.add_argument('--size', type=int, default=100, help='uncompressed size in MB of each filler sheet')
+  parser.add_argument('--cols', type=int, default=10)
+  parser.add_argument('--rows', type=int, default=10000, help='rows of the sheet that gets read')
+  parser.add_argument('--file', help='existing .xlsb to use instead of a synthetic one')
+  parser.add_argument('--sheet', default='Target', help='sheet to read from --file')
+  args = parser.parse_args()
+
+  path = args.file
+  sheet = args.sheet
+  if path is None:
+    fd, path = tempfile.mkstemp(suffix='.xlsb')
+    os.close(fd)
+    filler = rows_for_size(args.size << 20, args.cols)
+    print('writing 2 sheets of {} rows and one of {} rows to {}'.format(filler, args.rows, path))
+    write_workbook(path, [('Before', filler, args.cols), ('Target', args.rows, args.cols), ('After', filler, args.cols)])
+
+  try:
+    total = os.path.getsize(path)
+    print('{:>8} {:>9} {:>10} {:>9} {:>12} {:>7}'.format('block', 'readahead', 'rows', 'time', 'fetched', 'reqs'))
+    failed = False
+    for block_size, readahead in ((1 << 14, 1), (1 << 16, 1), (1 << 16, 16), (1 << 20, 8)):
+      count, elapsed, requests, fetched = run(path, sheet, block_size, readahead)
+      print('{:>7}K {:>9} {:>10} {:>8.3f}s {:>11.1f}% {:>7}'.format(
+        block_size >> 10, readahead, count, elapsed, 100.0 * fetched / total, requests))
+      bound = fetch_bound(path, sheet, block_size, readahead)
+      if fetched > bound:
+        print('fetched {} bytes, more than the {} the parts read account for'.format(fetched, bound))
+        failed = True
+    if failed:
+      sys.exit(1)
+  finally:
+    if args.file is None:
+      os.remove(path)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from tempfile import TemporaryFile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pyxlsb.handlers import Handler
+from pyxlsb.reader import BIFF12Reader, RecordReader
+from synth import sheet_data
+
+
+class BytewiseReader(BIFF12Reader):
+  # The original record loop: one read() call per header byte and one per record body
+  def next(self):
+    ret = None
+    while ret is None:
+      recid = self._read_varint(8, 0xFF)
+      reclen = self._read_varint(7, 0x7F)
+      if recid is None or reclen is None:
+        raise StopIteration
+      recdata = self._fp.read(reclen)
+      with RecordReader(recdata) as reader:
+        ret = (self.handlers.get(recid) or Handler()).read(reader, recid, reclen)
+    return (recid, ret)
+
+  def _read_varint(self, bits, mask):
+    v = 0
+    for i in range(4):
+      byte = self._fp.read(1)
+      if not byte:
+        return None
+      byte = struct.unpack('<B', byte)[0]
+      v += (byte & mask) << (bits * i)
+      if byte & 0x80 == 0:
+        break
+    return v
+
+
+class HandlerDictReader(BIFF12Reader):
+  # Buffered scan, but records still go through handlers.get() and the generic read()
+  def next(self):
+    ret = None
+    while ret is None:
+      recid, reclen, reader = self.read_record()
+      if recid is None:
+        raise StopIteration
+      ret = (self.handlers.get(recid) or Handler()).read(reader, recid, reclen)
+    return (recid, ret)
+
+
+def run(cls, fp):
+  fp.seek(0, os.SEEK_SET)
+  count = 0
+  start = time.time()
+  for _ in cls(fp=fp):
+    count += 1
+  return count, time.time() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare BIFF12 record scanning throughput')
+  parser.add_argument('--rows', type=int, default=100000)
+  parser.add_argument('--cols', type=int, default=10)
+  args = parser.parse_args()
+
+  with TemporaryFile() as fp:
+    fp.write(sheet_data(args.rows, args.cols))
+    for name, cls in (('bytewise', BytewiseReader), ('handlers', HandlerDictReader), ('dispatch', BIFF12Reader)):
+      count, elapsed = run(cls, fp)
+      print('{:<10} {:>10} records {:>8.3f}s {:>12.0f} records/s'.format(name, count, elapsed, count / elapsed))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pyxlsb import open_workbook
+from pyxlsb.parts import STORAGES
+from synth import rows_for_size, write_workbook
+
+
+def run(path, storage):
+  start = time.time()
+  count = 0
+  with open_workbook(path, storage=storage) as wb:
+    opened = time.time()
+    with wb.get_sheet(1) as sheet:
+      loaded = time.time()
+      for row in sheet.rows():
+        count += 1
+  end = time.time()
+  return count, opened - start, loaded - opened, end - loaded
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare part storage backends')
+  parser.add_argument('--size', type=int, default=500, help='uncompressed sheet size in MB')
+  parser.add_argument('--cols', type=int, default=10)
+  parser.add_argument('--file', help='existing .xlsb to use instead of a synthetic one')
+  args = parser.parse_args()
+
+  path = args.file
+  if path is None:
+    fd, path = tempfile.mkstemp(suffix='.xlsb')
+    os.close(fd)
+    rows = rows_for_size(args.size << 20, args.cols)
+    print('writing {} rows x {} cols to {}'.format(rows, args.cols, path))
+    write_workbook(path, [('Sheet1', rows, args.cols)])
+
+  try:
+    print('{:<8} {:>10} {:>9} {:>9} {:>9}'.format('storage', 'rows', 'open', 'extract', 'rows()'))
+    for storage in STORAGES:
+      count, opened, loaded, scanned = run(path, storage)
+      print('{:<8} {:>10} {:>8.3f}s {:>8.3f}s {:>8.3f}s'.format(storage, count, opened, loaded, scanned))
+  finally:
+    if args.file is None:
+      os.remove(path)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,183 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pyxlsb
+from pyxlsb import open_workbook
+from pyxlsb.parts import spool
+from pyxlsb.stringtable import StringTable
+from synth import MIX_KINDS, write_workbook
+
+
+def measure(fn, repeat=1, memory=False):
+  # Best wall time over `repeat` runs, peak traced allocations of a separate run when asked
+  best = None
+  result = None
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  peak = None
+  if memory:
+    gc.collect()
+    tracemalloc.start()
+    try:
+      fn()
+      peak = tracemalloc.get_traced_memory()[1]
+    finally:
+      tracemalloc.stop()
+  return best, result, peak
+
+
+def bench_open(path, storage):
+  def fn():
+    with open_workbook(path, storage=storage):
+      pass
+  return fn
+
+
+def bench_strings(path, storage, lazy):
+  import zipfile
+  def fn():
+    with zipfile.ZipFile(path) as zf:
+      temp = spool(zf, 'xl/sharedStrings.bin', storage)
+      with StringTable(fp=temp, lazy=lazy) as table:
+        return len(table)
+  return fn
+
+
+def bench_header(path, storage):
+  def fn():
+    with open_workbook(path, storage=storage) as wb:
+      start = time.perf_counter()
+      with wb.get_sheet(1):
+        return time.perf_counter() - start
+  return fn
+
+
+def bench_scan(path, storage, method):
+  def fn():
+    with open_workbook(path, storage=storage) as wb, wb.get_sheet(1) as sheet:
+      if method == 'rows':
+        return sum(1 for _ in sheet.rows())
+      elif method == 'compact':
+        return sum(1 for _ in sheet.rows(compact=True))
+      elif method == 'batches':
+        return sum(len(batch) for batch in sheet.iter_batches())
+      return len(next(iter(sheet.to_columns().values()), ()))
+  return fn
+
+
+def run_suite(path, storage, repeat):
+  results = []
+
+  def add(name, fn, scan=False, memory=False):
+    elapsed, result, peak = measure(fn, repeat, memory)
+    count = result if scan else None
+    if name == 'header':
+      # Only the get_sheet() call is timed inside, the workbook open around it is not part of this one
+      elapsed = result
+    entry = {'name': name, 'seconds': elapsed}
+    if count is not None:
+      entry['rows'] = count
+      entry['rows_per_sec'] = count / elapsed if elapsed else None
+    if peak is not None:
+      entry['peak_bytes'] = peak
+    results.append(entry)
+    print('{:<16} {:>9.4f}s{}{}'.format(
+      name, elapsed,
+      ' {:>12.0f} rows/s'.format(entry['rows_per_sec']) if count else '',
+      ' {:>10.1f} MB peak'.format(peak / (1 << 20)) if peak is not None else ''), file=sys.stderr)
+
+  add('open', bench_open(path, storage))
+  add('strings', bench_strings(path, storage, False), memory=True)
+  add('strings_lazy', bench_strings(path, storage, True), memory=True)
+  add('header', bench_header(path, storage))
+  for method in ('rows', 'compact', 'batches', 'columns'):
+    add(method, bench_scan(path, storage, method), scan=True, memory=True)
+  return results
+
+
+def compare(results, baseline):
+  # Ratios against a previous JSON run, > 1 means this run is slower
+  before = dict((entry['name'], entry) for entry in baseline['results'])
+  print('{:<16} {:>10} {:>10} {:>8}'.format('benchmark', 'before', 'after', 'ratio'), file=sys.stderr)
+  for entry in results:
+    old = before.get(entry['name'])
+    if old is None or not old['seconds']:
+      continue
+    print('{:<16} {:>9.4f}s {:>9.4f}s {:>7.2f}x'.format(entry['name'], old['seconds'], entry['seconds'], entry['seconds'] / old['seconds']), file=sys.stderr)
+
+
+def parse_mix(value):
+  mix = {}
+  for item in value.split(','):
+    kind, _, weight = item.partition('=')
+    if kind not in MIX_KINDS:
+      raise argparse.ArgumentTypeError('unknown cell kind {!r}, expected one of {}'.format(kind, ', '.join(MIX_KINDS)))
+    mix[kind] = float(weight or 1)
+  return mix
+
+
+def main():
+  parser = argparse.ArgumentParser(description='pyxlsb benchmark suite on a synthetic workbook')
+  parser.add_argument('--rows', type=int, default=100000)
+  parser.add_argument('--cols', type=int, default=20)
+  parser.add_argument('--strings', type=int, default=10000, help='shared string cardinality')
+  parser.add_argument('--mix', type=parse_mix, default=None, help='cell kind weights, e.g. float=3,string=1,bool=1')
+  parser.add_argument('--density', type=float, default=1.0, help='share of cells present')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--storage', default='file')
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--file', help='existing .xlsb to use instead of a synthetic one')
+  parser.add_argument('--output', '-o', help='write the JSON results here instead of stdout')
+  parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+  args = parser.parse_args()
+
+  path = args.file
+  if path is None:
+    fd, path = tempfile.mkstemp(suffix='.xlsb')
+    os.close(fd)
+    print('writing {} rows x {} cols to {}'.format(args.rows, args.cols, path), file=sys.stderr)
+    write_workbook(path, [('Sheet1', args.rows, args.cols)], strings=args.strings, mix=args.mix, density=args.density, seed=args.seed)
+
+  try:
+    results = run_suite(path, args.storage, args.repeat)
+  finally:
+    if args.file is None:
+      os.remove(path)
+
+  report = {
+    'pyxlsb': pyxlsb.__version__,
+    'python': platform.python_version(),
+    'platform': platform.platform(),
+    'params': {
+      'rows': args.rows, 'cols': args.cols, 'strings': args.strings, 'mix': args.mix,
+      'density': args.density, 'seed': args.seed, 'storage': args.storage, 'repeat': args.repeat,
+      'file': args.file
+    },
+    'results': results
+  }
+  if args.compare:
+    with open(args.compare) as f:
+      compare(results, json.load(f))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(report, f, indent=2)
+  else:
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+  main()
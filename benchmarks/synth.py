@@ -0,0 +1,167 @@
+import random
+import struct
+import zipfile
+
+from pyxlsb import biff12
+
+RELS_TEMPLATE = (
+  '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{}</Relationships>'
+)
+SHEET_REL_TEMPLATE = (
+  '<Relationship Id="rId{0}" '
+  'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+  'Target="worksheets/sheet{0}.bin"/>'
+)
+
+
+def record(recid, data=b''):
+  out = bytearray()
+  while True:
+    byte = recid & 0xFF
+    out.append(byte)
+    recid >>= 8
+    if byte & 0x80 == 0:
+      break
+  size = len(data)
+  while True:
+    byte = size & 0x7F
+    size >>= 7
+    out.append(byte | 0x80 if size else byte)
+    if not size:
+      break
+  return bytes(out) + data
+
+
+def wide_string(value):
+  return struct.pack('<I', len(value)) + value.encode('utf-16-le')
+
+
+def workbook_part(names):
+  parts = [record(biff12.WORKBOOK), record(biff12.SHEETS)]
+  for i, name in enumerate(names):
+    parts.append(record(biff12.SHEET, struct.pack('<II', 0, i + 1) + wide_string('rId{}'.format(i + 1)) + wide_string(name)))
+  parts.append(record(biff12.SHEETS_END))
+  parts.append(record(biff12.WORKBOOK_END))
+  return b''.join(parts)
+
+
+def shared_strings_part(strings):
+  parts = [record(biff12.SST, struct.pack('<II', len(strings), len(strings)))]
+  for value in strings:
+    parts.append(record(biff12.SI, b'\x00' + wide_string(value)))
+  parts.append(record(biff12.SST_END))
+  return b''.join(parts)
+
+
+def styles_part(xfs=(0,), formats=()):
+  # xfs are numFmtIds, one XF record each, formats are custom (numFmtId, code) pairs
+  parts = [record(biff12.STYLESHEET), record(biff12.FMTS)]
+  for fmtid, code in formats:
+    parts.append(record(biff12.FMT, struct.pack('<H', fmtid) + wide_string(code)))
+  parts.append(record(biff12.FMTS_END))
+  parts.append(record(biff12.CELLXFS))
+  for fmtid in xfs:
+    parts.append(record(biff12.XF, struct.pack('<HHHHHBBI', 0, fmtid, 0, 0, 0, 0, 0, 0)))
+  parts.append(record(biff12.CELLXFS_END))
+  parts.append(record(biff12.STYLESHEET_END))
+  return b''.join(parts)
+
+
+def sheet_header(rows, cols):
+  return b''.join([
+    record(biff12.WORKSHEET),
+    record(biff12.DIMENSION, struct.pack('<IIII', 0, max(rows - 1, 0), 0, max(cols - 1, 0))),
+    record(biff12.SHEETDATA)
+  ])
+
+
+def sheet_footer(hyperlinks=()):
+  # hyperlinks are (r1, c1, r2, c2) ranges, linked to rId1, rId2, ... in order
+  links = [record(biff12.HYPERLINK, struct.pack('<IIII', r1, r2, c1, c2) + wide_string('rId{}'.format(i + 1)))
+           for i, (r1, c1, r2, c2) in enumerate(hyperlinks)]
+  return b''.join([record(biff12.SHEETDATA_END)] + links + [record(biff12.WORKSHEET_END)])
+
+
+def hyperlink_rels(count):
+  return RELS_TEMPLATE.format(''.join(
+    '<Relationship Id="rId{0}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink" '
+    'Target="https://example.com/{0}" TargetMode="External"/>'.format(i + 1) for i in range(count)))
+
+
+# Cell kinds for the `mix` weights, each maps to the record type Excel writes for it
+MIX_KINDS = ('float', 'rk', 'string', 'bool', 'error', 'formula', 'text')
+
+
+def cell_record(kind, r, c, strings, rng):
+  if kind == 'rk':
+    return record(biff12.NUM, struct.pack('<IIi', c, 0, ((r + c) % (1 << 29)) << 2 | 2))
+  elif kind == 'string' and strings:
+    return record(biff12.STRING, struct.pack('<III', c, 0, rng.randrange(strings)))
+  elif kind == 'bool':
+    return record(biff12.BOOL, struct.pack('<IIB', c, 0, (r + c) & 1))
+  elif kind == 'error':
+    return record(biff12.BOOLERR, struct.pack('<IIB', c, 0, 0x07))
+  elif kind == 'formula':
+    return record(biff12.FORMULA_FLOAT, struct.pack('<IIdH', c, 0, r * 0.25 + c, 0))
+  elif kind == 'text':
+    return record(biff12.FORMULA_STRING, struct.pack('<II', c, 0) + wide_string('f{}'.format(r % 97)) + b'\x00\x00')
+  return record(biff12.FLOAT, struct.pack('<IId', c, 0, r * 0.5 + c))
+
+
+def row_records(r, cols, strings=100, mix=None, density=1.0, rng=None):
+  parts = [record(biff12.ROW, struct.pack('<IIHHBIII', r, 0, 300, 0, 0, 1, 0, cols - 1))]
+  if mix is None and density >= 1.0:
+    # Every third column is a shared string, the rest are doubles
+    for c in range(cols):
+      if strings and c % 3 == 0:
+        parts.append(record(biff12.STRING, struct.pack('<III', c, 0, (r + c) % strings)))
+      else:
+        parts.append(record(biff12.FLOAT, struct.pack('<IId', c, 0, r * 0.5 + c)))
+    return b''.join(parts)
+
+  rng = rng or random.Random(r)
+  kinds = list((mix or {'float': 2, 'string': 1}).items())
+  names = [k for k, _ in kinds]
+  weights = [w for _, w in kinds]
+  for c in range(cols):
+    if density < 1.0 and rng.random() >= density:
+      continue
+    parts.append(cell_record(rng.choices(names, weights)[0], r, c, strings, rng))
+  return b''.join(parts)
+
+
+def sheet_data(rows, cols, strings=100):
+  return b''.join([record(biff12.SHEETDATA)] + [row_records(r, cols, strings) for r in range(rows)] + [record(biff12.SHEETDATA_END)])
+
+
+def rows_for_size(size, cols):
+  return max(1, size // len(row_records(0, cols)))
+
+
+def write_workbook(path, sheets=(('Sheet1', 1000, 10),), strings=100, styles=None, mix=None, density=1.0, seed=0, hyperlinks=0):
+  # mix: {kind: weight} over MIX_KINDS, density: share of cells present, strings: shared string cardinality
+  # hyperlinks: count per sheet, the first one covers all of column A and the others single random cells
+  rng = random.Random(seed)
+  with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+    rels = ''.join(SHEET_REL_TEMPLATE.format(i + 1) for i in range(len(sheets)))
+    zf.writestr('xl/_rels/workbook.bin.rels', RELS_TEMPLATE.format(rels))
+    zf.writestr('xl/workbook.bin', workbook_part([name for name, _, _ in sheets]))
+    if strings:
+      zf.writestr('xl/sharedStrings.bin', shared_strings_part(['str{}'.format(i) for i in range(strings)]))
+    if styles is not None:
+      zf.writestr('xl/styles.bin', styles)
+    for i, (name, rows, cols) in enumerate(sheets):
+      with zf.open('xl/worksheets/sheet{}.bin'.format(i + 1), 'w', force_zip64=True) as part:
+        part.write(sheet_header(rows, cols))
+        for r in range(rows):
+          part.write(row_records(r, cols, strings, mix, density, rng))
+        links = []
+        if hyperlinks:
+          links.append((0, 0, 1048575, 0))
+          links.extend((r, c, r, c) for r, c in ((rng.randrange(max(rows, 1)), rng.randrange(1, max(cols, 2))) for _ in range(hyperlinks - 1)))
+        part.write(sheet_footer(links))
+      if hyperlinks:
+        zf.writestr('xl/worksheets/_rels/sheet{}.bin.rels'.format(i + 1), hyperlink_rels(hyperlinks))
+  return path
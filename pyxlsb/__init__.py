@@ -1,14 +1,36 @@
+import sys
 from .handlers import Handler
 from .reader import BIFF12Reader
 from .workbook import Workbook
 from .worksheet import Worksheet
 
+if sys.version_info >= (3, 5):
+  from .aio import aopen_workbook
+
 __version__ = '1.0.11'
 
-def open_workbook(name, debug=False):
+def open_workbook(name, debug=False, stream=False, storage='file', lazy_strings=False, cache=False, instrument=None, pipeline=False, prefetch=None):
   from zipfile import ZipFile
-  zf = ZipFile(name, 'r')
-  return Workbook(fp=zf, debug=debug)
+  from .sources import RangeFile, RangeReader
+  source = None
+  if isinstance(name, RangeReader):
+    # Wrapped here, so closing the workbook closes it and the reader
+    name = source = RangeFile(name)
+  try:
+    if cache:
+      if hasattr(name, 'read'):
+        raise ValueError('the metadata cache needs a workbook file name')
+      from .cache import WorkbookCache
+      cache = WorkbookCache(name, None if cache is True else cache)
+    else:
+      cache = None
+    zf = ZipFile(name, 'r')
+    return Workbook(fp=zf, debug=debug, stream=stream, storage=storage, lazy_strings=lazy_strings, cache=cache, instrument=instrument,
+                    pipeline=pipeline, prefetch=prefetch, source=source)
+  except Exception:
+    if source is not None:
+      source.close()
+    raise
 
 def convert_date(date):
   if not isinstance(date, int) and not isinstance(date, float):
@@ -23,3 +45,27 @@ def convert_date(date):
   else:
     # Feb 29th 1900 will show up as Mar 1st 1900 because Python won't handle that date
     return datetime(1899, 12, 31, 0, 0, 0) + timedelta(days=int(date), seconds=round((date % 1) * 24 * 60 * 60))
+
+def convert_dates(dates):
+  # Serial dates repeat a lot in real sheets, each distinct value only gets converted once
+  cache = {}
+  ret = []
+  for date in dates:
+    if date not in cache:
+      cache[date] = convert_date(date)
+    ret.append(cache[date])
+  return ret
+
+def convert_dates64(dates):
+  import numpy as np
+  dates = np.asarray(dates, dtype=np.float64)
+  days = np.trunc(dates)
+  frac = np.where(days == 0, dates, np.mod(dates, 1))
+  # Same epochs as convert_date(), including the Lotus 1-2-3 Feb 29th 1900 shift from day 61 on
+  base = np.where(days == 0, np.datetime64('1900-01-01', 's'), np.datetime64('1899-12-31', 's'))
+  days = np.where(days >= 61, days - 1, np.where(days == 0, 0, days))
+  nat = np.isnan(dates)
+  secs = np.where(nat, 0, days * 86400 + np.round(frac * 86400)).astype(np.int64)
+  ret = base + secs.astype('m8[s]')
+  ret[nat] = np.datetime64('NaT')
+  return ret
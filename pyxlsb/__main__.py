@@ -0,0 +1,4 @@
+import sys
+from .export import main
+
+sys.exit(main())
@@ -0,0 +1,128 @@
+import math
+from . import biff12
+from collections import namedtuple
+
+MASK64 = (1 << 64) - 1
+
+# Distinct values counted exactly until there are this many, then estimated
+DEFAULT_EXACT = 1 << 14
+DEFAULT_PRECISION = 12
+
+Summary = namedtuple('Summary', ['c', 'rows', 'count', 'nulls', 'numbers', 'strings', 'bools', 'errors', 'dates', 'min', 'max', 'sum', 'distinct'])
+
+def _mix(h):
+  # splitmix64 finalizer, hash() of small ints and integral floats is the value itself
+  h &= MASK64
+  h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+  h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK64
+  return h ^ (h >> 31)
+
+class Distinct(object):
+  # Exact set of values up to `exact` of them, a HyperLogLog sketch past that
+  __slots__ = ('values', 'registers', 'exact', 'precision')
+
+  def __init__(self, exact=DEFAULT_EXACT, precision=DEFAULT_PRECISION):
+    self.values = set()
+    self.registers = None
+    self.exact = exact
+    self.precision = precision
+
+  def add(self, v):
+    if self.registers is None:
+      self.values.add(v)
+      if len(self.values) > self.exact:
+        self._sketch()
+    else:
+      self._add_hash(hash(v))
+
+  def _sketch(self):
+    self.registers = bytearray(1 << self.precision)
+    for v in self.values:
+      self._add_hash(hash(v))
+    self.values = None
+
+  def _add_hash(self, h):
+    p = self.precision
+    h = _mix(h)
+    idx = h >> (64 - p)
+    # Leading zeros of the remaining bits plus one
+    rank = min(65 - ((h << p) & MASK64).bit_length(), 65 - p)
+    if rank > self.registers[idx]:
+      self.registers[idx] = rank
+
+  def __len__(self):
+    if self.registers is None:
+      return len(self.values)
+    registers = self.registers
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+      # Linear counting does better while the sketch is still mostly empty
+      estimate = m * math.log(float(m) / zeros)
+    return int(round(estimate))
+
+
+class ColumnAggregate(object):
+  # Running statistics of one column, folded from raw cell records without building any value objects
+  __slots__ = ('c', 'numbers', 'strings', 'bools', 'errors', 'blanks', 'dates', 'min', 'max', 'sum', '_distinct', '_distinct_strings', '_bool_values')
+
+  def __init__(self, c):
+    self.c = c
+    self.numbers = 0
+    self.strings = 0
+    self.bools = 0
+    self.errors = 0
+    self.blanks = 0
+    self.dates = 0
+    self.min = None
+    self.max = None
+    self.sum = 0.0
+    self._distinct = Distinct()
+    # Shared strings go in by their index, so they never get looked up
+    self._distinct_strings = Distinct()
+    self._bool_values = set()
+
+  def add(self, recid, rec, styles=None):
+    # Same contract as Column._set(), the record is positioned right after its column field
+    if recid == biff12.NUM or recid == biff12.FLOAT or recid == biff12.FORMULA_FLOAT:
+      style = rec.read_int()
+      v = rec.read_float() if recid == biff12.NUM else rec.read_double()
+      self.numbers += 1
+      if styles is not None and styles.is_date(style):
+        self.dates += 1
+      if v == v:
+        self.sum += v
+        if self.min is None or v < self.min:
+          self.min = v
+        if self.max is None or v > self.max:
+          self.max = v
+      self._distinct.add(v)
+    elif recid == biff12.STRING:
+      rec.skip(4)
+      self.strings += 1
+      self._distinct_strings.add(rec.read_int())
+    elif recid == biff12.FORMULA_STRING:
+      rec.skip(4)
+      self.strings += 1
+      self._distinct_strings.add(rec.read_string())
+    elif recid == biff12.BOOL or recid == biff12.FORMULA_BOOL:
+      rec.skip(4)
+      self.bools += 1
+      self._bool_values.add(rec.read_byte() != 0)
+    elif recid == biff12.BLANK:
+      self.blanks += 1
+    elif recid == biff12.BOOLERR or recid == biff12.FORMULA_BOOLERR:
+      self.errors += 1
+
+  @property
+  def count(self):
+    return self.numbers + self.strings + self.bools
+
+  def summary(self, rows):
+    # Nulls are the blank and missing cells over `rows` rows, error cells are neither values nor nulls
+    count = self.count
+    distinct = len(self._distinct) + len(self._distinct_strings) + len(self._bool_values)
+    return Summary(self.c, rows, count, max(rows - count - self.errors, 0), self.numbers, self.strings, self.bools,
+                   self.errors, self.dates, self.min, self.max, self.sum if self.numbers else None, distinct)
@@ -0,0 +1,109 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 1000
+
+_executor = None
+
+def _default_executor():
+  # Shared by every workbook opened without an explicit executor, bounds how many blocking chunks run at once
+  global _executor
+  if _executor is None:
+    _executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS)
+  return _executor
+
+async def aopen_workbook(name, executor=None, **kwargs):
+  from . import open_workbook
+  executor = executor or _default_executor()
+  wb = await asyncio.get_event_loop().run_in_executor(executor, lambda: open_workbook(name, **kwargs))
+  return AsyncWorkbook(wb, executor)
+
+
+class AsyncWorkbook(object):
+  def __init__(self, wb, executor=None):
+    super(AsyncWorkbook, self).__init__()
+    self.workbook = wb
+    self._executor = executor or _default_executor()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, type, value, traceback):
+    await self.close()
+
+  @property
+  def sheets(self):
+    return self.workbook.sheets
+
+  def _run(self, fn, *args):
+    return asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+
+  async def get_sheet(self, idx, rels=False):
+    sheet = await self._run(lambda: self.workbook.get_sheet(idx, rels=rels))
+    return AsyncWorksheet(sheet, self._executor)
+
+  async def close(self):
+    await self._run(self.workbook.close)
+
+
+class AsyncWorksheet(object):
+  def __init__(self, sheet, executor=None):
+    super(AsyncWorksheet, self).__init__()
+    self.sheet = sheet
+    self._executor = executor or _default_executor()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, type, value, traceback):
+    await self.close()
+
+  @property
+  def name(self):
+    return self.sheet.name
+
+  @property
+  def dimension(self):
+    return self.sheet.dimension
+
+  def batches(self, size=DEFAULT_BATCH_SIZE, **kwargs):
+    return RowBatches(self.sheet.rows(**kwargs), size, self._executor)
+
+  def rows(self, size=DEFAULT_BATCH_SIZE, **kwargs):
+    return RowBatches(self.sheet.rows(**kwargs), size, self._executor, flatten=True)
+
+  async def close(self):
+    await asyncio.get_event_loop().run_in_executor(self._executor, self.sheet.close)
+
+
+class RowBatches(object):
+  # Async iterator decoding `size` rows per executor call, the next batch is only read once the consumer asks for it
+  def __init__(self, rows, size, executor, flatten=False):
+    super(RowBatches, self).__init__()
+    self._rows = rows
+    self._size = size
+    self._executor = executor
+    self._flatten = flatten
+    self._batch = iter(())
+
+  def __aiter__(self):
+    return self
+
+  def _read(self):
+    return list(islice(self._rows, self._size))
+
+  async def _next_batch(self):
+    batch = await asyncio.get_event_loop().run_in_executor(self._executor, self._read)
+    if not batch:
+      raise StopAsyncIteration
+    return batch
+
+  async def __anext__(self):
+    if not self._flatten:
+      return await self._next_batch()
+    for row in self._batch:
+      return row
+    self._batch = iter(await self._next_batch())
+    return next(self._batch)
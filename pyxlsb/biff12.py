@@ -76,6 +76,7 @@ SST_END = 0x01A0
 
 # Styles records
 FONT             = 0x002B
+FMT              = 0x002C
 FILL             = 0x002D
 BORDER           = 0x002E
 XF               = 0x002F
@@ -86,6 +87,8 @@ COLORS           = 0x03D9
 COLORS_END       = 0x03DA
 DXFS             = 0x03F9
 DXFS_END         = 0x03FA
+FMTS             = 0x04E7
+FMTS_END         = 0x04E8
 TABLESTYLES      = 0x03FC
 TABLESTYLES_END  = 0x03FD
 FILLS            = 0x04DB
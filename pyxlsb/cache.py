@@ -0,0 +1,126 @@
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+from .index import OFFSET_TYPECODE, RowIndex
+from array import array
+
+# Bump whenever the layout of the cached entries changes
+CACHE_VERSION = 2
+
+MAGIC = b'PXLC'
+
+# Magic, then the length of the JSON part, which is followed by the raw string offsets and row indexes
+header_t = struct.Struct('<4sI')
+
+def _pack_offsets(offsets):
+  if offsets.typecode != 'd' and offsets.itemsize == 8 and sys.byteorder == 'little':
+    return offsets.tobytes() if hasattr(offsets, 'tobytes') else offsets.tostring()
+  return struct.pack('<{}Q'.format(len(offsets)), *[int(offset) for offset in offsets])
+
+def _unpack_offsets(data):
+  offsets = array(OFFSET_TYPECODE)
+  if offsets.typecode != 'd' and offsets.itemsize == 8 and sys.byteorder == 'little':
+    if hasattr(offsets, 'frombytes'):
+      offsets.frombytes(data)
+    else:
+      offsets.fromstring(data)
+    return offsets
+  offsets.extend(struct.unpack('<{}Q'.format(len(data) // 8), data))
+  return offsets
+
+class WorkbookCache(object):
+  # Sidecar file of parsed workbook metadata, only trusted while the workbook's path, size and mtime are unchanged.
+  # It only ever holds plain data (JSON and packed integers), loading one never runs any code.
+  def __init__(self, name, directory=None):
+    super(WorkbookCache, self).__init__()
+    name = os.path.abspath(name)
+    st = os.stat(name)
+    self.key = [CACHE_VERSION, name, st.st_size, st.st_mtime]
+    if directory is None:
+      directory, base = os.path.split(name)
+      self.path = os.path.join(directory, '.{}.pyxlsb-cache'.format(base))
+    else:
+      self.path = os.path.join(directory, '{}.pyxlsb-cache'.format(hashlib.sha1(name.encode('utf-8')).hexdigest()))
+    self.sheets = None
+    self.strings = None
+    self._headers = {}
+    self._saved = None
+    self._load()
+
+  def _load(self):
+    try:
+      with open(self.path, 'rb') as f:
+        data = f.read()
+      sheets, strings, headers = self._decode(data)
+    except Exception:
+      # Missing, unreadable, not ours or for another version of the file, start over
+      return
+    self.sheets = sheets
+    self.strings = strings
+    self._headers = headers
+    self._saved = data
+
+  def _decode(self, data):
+    magic, size = header_t.unpack_from(data, 0)
+    if magic != MAGIC:
+      raise ValueError('not a pyxlsb cache')
+    pos = header_t.size
+    meta = json.loads(data[pos:pos + size].decode('utf-8'))
+    if meta['key'] != self.key:
+      raise ValueError('stale cache')
+    fp = io.BytesIO(data)
+    fp.seek(pos + size)
+    strings = None
+    if meta['strings'] is not None:
+      strings = _unpack_offsets(fp.read(8 * meta['strings']))
+    headers = {}
+    for name, header in meta['headers']:
+      if header.pop('index', None):
+        header['index'] = RowIndex.load(fp)
+      headers[name] = header
+    sheets = [tuple(sheet) for sheet in meta['sheets']] if meta['sheets'] is not None else None
+    return sheets, strings, headers
+
+  def _encode(self):
+    blobs = []
+    headers = []
+    for name, header in sorted(self._headers.items()):
+      header = dict(header)
+      index = header.pop('index', None)
+      if index is not None:
+        fp = io.BytesIO()
+        index.dump(fp)
+        blobs.append(fp.getvalue())
+        header['index'] = True
+      headers.append((name, header))
+    meta = json.dumps({
+      'key': self.key,
+      'sheets': self.sheets,
+      'strings': len(self.strings) if self.strings is not None else None,
+      'headers': headers
+    }, sort_keys=True).encode('utf-8')
+    if self.strings is not None:
+      blobs.insert(0, _pack_offsets(self.strings))
+    return b''.join([header_t.pack(MAGIC, len(meta)), meta] + blobs)
+
+  def header(self, name):
+    # Mutable per-sheet entry, the worksheet fills it in on first parse
+    return self._headers.setdefault(name, {})
+
+  def save(self):
+    data = self._encode()
+    if data == self._saved:
+      return
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(self.path))
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+      getattr(os, 'replace', os.rename)(temp, self.path)
+    except Exception:
+      os.remove(temp)
+      raise
+    self._saved = data
@@ -0,0 +1,117 @@
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+from .worksheet import DEFAULT_BATCH_SIZE
+
+WRITE_BUFSIZE = 1 << 20
+
+_unsafe_re = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+if sys.version_info > (3,):
+  unicode = str
+
+def _open_output(path):
+  # csv wants bytes on Python 2 and newline-less text on Python 3
+  if sys.version_info > (3,):
+    return io.open(path, 'w', newline='', encoding='utf-8', buffering=WRITE_BUFSIZE)
+  return io.open(path, 'wb', buffering=WRITE_BUFSIZE)
+
+def sheet_filename(name, ext='csv'):
+  return '{}.{}'.format(_unsafe_re.sub('_', name) or '_', ext)
+
+def export_sheet(sheet, fp, delimiter=',', convert_dates=False, sparse=False, batch_size=DEFAULT_BATCH_SIZE):
+  writer = csv.writer(fp, delimiter=delimiter, lineterminator='\n')
+  count = 0
+  # Whole batches of value tuples go to writerows(), there is no Python-level work per row
+  encode = sys.version_info < (3,)
+  for batch in sheet.iter_batches(size=batch_size, sparse=sparse, convert_dates=convert_dates):
+    if encode:
+      # The Python 2 csv module only writes bytes, strings go out as UTF-8 like on Python 3
+      batch = [tuple(v.encode('utf-8') if isinstance(v, unicode) else v for v in row) for row in batch]
+    writer.writerows(batch)
+    count += len(batch)
+  return count
+
+def _export_sheet(wb, idx, path, kwargs):
+  with wb.get_sheet(idx) as sheet, _open_output(path) as fp:
+    return export_sheet(sheet, fp, **kwargs)
+
+def _export_one(args):
+  name, idx, path, kwargs = args
+  from . import open_workbook
+  with open_workbook(name, storage=kwargs.pop('storage', 'file')) as wb:
+    return _export_sheet(wb, idx, path, kwargs)
+
+def _resolve_sheets(wb, sheets):
+  if sheets is None:
+    sheets = wb.sheets
+  idxs = [wb._sheet_index(idx) for idx in sheets]
+  return idxs, [wb.sheets[idx - 1] for idx in idxs]
+
+def export_workbook(name, outdir, sheets=None, workers=1, ext='csv', storage='file', **kwargs):
+  from . import open_workbook
+  if workers is not None and workers <= 1:
+    # One workbook, and one shared string table, for every sheet
+    with open_workbook(name, storage=storage) as wb:
+      idxs, names = _resolve_sheets(wb, sheets)
+      paths = [os.path.join(outdir, sheet_filename(sheet, ext)) for sheet in names]
+      counts = [_export_sheet(wb, idx, path, kwargs) for idx, path in zip(idxs, paths)]
+    return list(zip(names, paths, counts))
+
+  # Only the sheet names are needed here, lazy strings keep the table from being decoded
+  with open_workbook(name, lazy_strings=True) as wb:
+    idxs, names = _resolve_sheets(wb, sheets)
+  paths = [os.path.join(outdir, sheet_filename(sheet, ext)) for sheet in names]
+  tasks = [(name, idx, path, dict(kwargs, storage=storage)) for idx, path in zip(idxs, paths)]
+  # Every sheet gets exported by its own process straight to its file, only the row counts come back
+  from multiprocessing import Pool
+  pool = Pool(workers)
+  try:
+    counts = pool.map(_export_one, tasks)
+  finally:
+    pool.terminate()
+    pool.join()
+  return list(zip(names, paths, counts))
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='pyxlsb', description='Export xlsb worksheets to CSV/TSV')
+  parser.add_argument('file', help='xlsb workbook')
+  parser.add_argument('-s', '--sheet', action='append', help='sheet name or 1-based index, can be repeated (default: first sheet)')
+  parser.add_argument('-a', '--all', action='store_true', help='export every sheet, one file each in --output')
+  parser.add_argument('-o', '--output', default='-', help='output file, or directory when exporting several sheets (default: stdout)')
+  parser.add_argument('-t', '--tsv', action='store_true', help='tab separated output')
+  parser.add_argument('-d', '--delimiter', default=None, help='field delimiter (default: ,)')
+  parser.add_argument('--dates', action='store_true', help='convert date formatted cells to dates')
+  parser.add_argument('--sparse', action='store_true', help='skip empty rows')
+  parser.add_argument('-j', '--workers', type=int, default=1, help='processes used when exporting several sheets')
+  parser.add_argument('--storage', default='file', choices=['file', 'mmap', 'memory'])
+  parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+  args = parser.parse_args(argv)
+
+  delimiter = args.delimiter or ('\t' if args.tsv else ',')
+  ext = 'tsv' if delimiter == '\t' else 'csv'
+  sheets = [int(s) if s.isdigit() else s for s in args.sheet] if args.sheet else None
+  kwargs = dict(delimiter=delimiter, convert_dates=args.dates, sparse=args.sparse, batch_size=args.batch_size)
+
+  if args.all or (sheets is not None and len(sheets) > 1):
+    if args.output == '-':
+      parser.error('exporting several sheets needs an --output directory')
+    if not os.path.isdir(args.output):
+      os.makedirs(args.output)
+    for name, path, count in export_workbook(args.file, args.output, sheets, args.workers, ext, args.storage, **kwargs):
+      sys.stderr.write('{}: {} rows -> {}\n'.format(name, count, path))
+    return 0
+
+  from . import open_workbook
+  with open_workbook(args.file, storage=args.storage) as wb:
+    with wb.get_sheet(sheets[0] if sheets else 1) as sheet:
+      if args.output == '-':
+        export_sheet(sheet, sys.stdout, **kwargs)
+        sys.stdout.flush()
+      else:
+        with _open_output(args.output) as fp:
+          export_sheet(sheet, fp, **kwargs)
+  return 0
@@ -0,0 +1,166 @@
+import sys
+from . import biff12
+from datetime import date, datetime
+
+if sys.version_info > (3,):
+  basestring = (str, bytes)
+  long = int
+
+ERROR_RECORDS = (biff12.BOOLERR, biff12.FORMULA_BOOLERR)
+
+# Value kinds, predicates only ever match cells holding the same kind as their operands
+NUMBER = 0
+BOOL   = 1
+STRING = 2
+
+def column_index(c):
+  # Zero-based column number from an int or from letters like 'C' or 'AB'
+  if not isinstance(c, basestring):
+    return c
+  if not c.isalpha():
+    raise ValueError('invalid column: {!r}'.format(c))
+  n = 0
+  for ch in c.upper():
+    n = n * 26 + ord(ch) - ord('A') + 1
+  return n - 1
+
+def date_serial(value):
+  # Inverse of convert_date(), keeping the Lotus 1-2-3 Feb 29th 1900
+  if not isinstance(value, datetime):
+    value = datetime(value.year, value.month, value.day)
+  delta = value - datetime(1899, 12, 31)
+  days = delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400.0
+  return days + 1 if days >= 60 else days
+
+def _operand(value):
+  # Dates are compared as the serial numbers they are stored as
+  if isinstance(value, bool):
+    return BOOL, value
+  elif isinstance(value, (int, long, float)):
+    return NUMBER, float(value)
+  elif isinstance(value, (datetime, date)):
+    return NUMBER, date_serial(value)
+  elif isinstance(value, basestring):
+    return STRING, value
+  raise TypeError('unsupported predicate value: {!r}'.format(value))
+
+def _kind(v):
+  if isinstance(v, bool):
+    return BOOL
+  return STRING if isinstance(v, basestring) else NUMBER
+
+
+class Predicate(object):
+  # `null` tells whether a missing or blank cell satisfies it, `errors` whether an error cell does
+  null = False
+  errors = False
+
+  def __init__(self, c):
+    super(Predicate, self).__init__()
+    self.c = column_index(c)
+
+  def test(self, v):
+    raise NotImplementedError
+
+
+class Equals(Predicate):
+  def __init__(self, c, value):
+    super(Equals, self).__init__(c)
+    self.kind, self.value = _operand(value)
+
+  def test(self, v):
+    return v == self.value and _kind(v) == self.kind
+
+
+class Range(Predicate):
+  def __init__(self, c, gt=None, ge=None, lt=None, le=None):
+    super(Range, self).__init__(c)
+    self.low, self.low_closed = (ge, True) if ge is not None else (gt, False)
+    self.high, self.high_closed = (le, True) if le is not None else (lt, False)
+    if self.low is None and self.high is None:
+      raise ValueError('range without bounds')
+    kinds = set()
+    if self.low is not None:
+      kind, self.low = _operand(self.low)
+      kinds.add(kind)
+    if self.high is not None:
+      kind, self.high = _operand(self.high)
+      kinds.add(kind)
+    if len(kinds) > 1:
+      raise TypeError('range bounds of different types')
+    self.kind = kinds.pop()
+
+  def test(self, v):
+    if _kind(v) != self.kind:
+      return False
+    low, high = self.low, self.high
+    if low is not None and (v < low or (v == low and not self.low_closed)):
+      return False
+    if high is not None and (v > high or (v == high and not self.high_closed)):
+      return False
+    return True
+
+
+class In(Predicate):
+  def __init__(self, c, values):
+    super(In, self).__init__(c)
+    self.values = {}
+    for value in values:
+      kind, value = _operand(value)
+      self.values.setdefault(kind, set()).add(value)
+
+  def test(self, v):
+    values = self.values.get(_kind(v))
+    return values is not None and v in values
+
+
+class IsNull(Predicate):
+  null = True
+
+  def test(self, v):
+    return False
+
+
+class NotNull(Predicate):
+  errors = True
+
+  def test(self, v):
+    return True
+
+
+def _column_check(preds, stringtable):
+  null = all(p.null for p in preds)
+  errors = all(p.errors for p in preds)
+  tests = [p.test for p in preds]
+  # Shared strings are settled once per string index, repeated values never get looked up again
+  seen = {}
+
+  def check(recid, v):
+    if recid == biff12.BLANK:
+      return null
+    elif recid in ERROR_RECORDS:
+      return errors
+    elif recid == biff12.STRING and stringtable is not None:
+      ok = seen.get(v)
+      if ok is None:
+        s = stringtable[v]
+        ok = seen[v] = all(test(s) for test in tests)
+      return ok
+    for test in tests:
+      if not test(v):
+        return False
+    return True
+
+  return check, not null
+
+def compile_where(where, stringtable=None):
+  # Column -> (check(recid, value), required) and the number of required columns, a row passes when
+  # every cell checked passes and every required column had a cell
+  if isinstance(where, Predicate):
+    where = [where]
+  by_column = {}
+  for pred in where:
+    by_column.setdefault(pred.c, []).append(pred)
+  checks = dict((c, _column_check(preds, stringtable)) for c, preds in by_column.items())
+  required = sum(1 for check in checks.values() if check[1])
+  return checks, required
@@ -1,6 +1,16 @@
+import struct
 from . import biff12
 from collections import namedtuple
 
+# Fixed part of each cell record: column, style, then the value where it has a fixed width
+cell_t = struct.Struct('<II')
+cell_rk_t = struct.Struct('<IIi')
+cell_byte_t = struct.Struct('<IIB')
+cell_double_t = struct.Struct('<IId')
+cell_int_t = struct.Struct('<III')
+double_t = struct.Struct('<d')
+rk_t = struct.Struct('<I')
+
 class Handler(object):
   def __init__(self):
     super(Handler, self).__init__()
@@ -9,6 +19,15 @@ class Handler(object):
     if reclen > 0:
       reader.skip(reclen)
 
+  def decoder(self, recid):
+    # Callable used by the reader's dispatch table for `recid`, subclasses can hand out specialized ones
+    return self.read
+
+
+def _func(method):
+  # Unbound methods on Python 2 are new objects on every access, compare the functions underneath
+  return getattr(method, '__func__', method)
+
 
 class BasicHandler(Handler):
   def __init__(self, name=None):
@@ -102,6 +121,68 @@ class CellHandler(Handler):
 
   def __init__(self):
     super(CellHandler, self).__init__()
+    make = self.cls._make
+    read = self.read
+
+    def rk(reader, recid, reclen):
+      if reader._end - reader._pos < 12:
+        return read(reader, recid, reclen)
+      col, style, intval = cell_rk_t.unpack_from(reader._buf, reader._pos)
+      if intval & 0x02 != 0:
+        val = float(intval >> 2)
+      else:
+        val = double_t.unpack(b'\x00\x00\x00\x00' + rk_t.pack(intval & 0xFFFFFFFC))[0]
+      if intval & 0x01 != 0:
+        val /= 100
+      return make([col, val, None, style])
+
+    def double(reader, recid, reclen):
+      if reader._end - reader._pos < 16:
+        return read(reader, recid, reclen)
+      col, style, val = cell_double_t.unpack_from(reader._buf, reader._pos)
+      return make([col, val, None, style])
+
+    def boolean(reader, recid, reclen):
+      if reader._end - reader._pos < 9:
+        return read(reader, recid, reclen)
+      col, style, val = cell_byte_t.unpack_from(reader._buf, reader._pos)
+      return make([col, val != 0, None, style])
+
+    def error(reader, recid, reclen):
+      if reader._end - reader._pos < 9:
+        return read(reader, recid, reclen)
+      col, style, val = cell_byte_t.unpack_from(reader._buf, reader._pos)
+      return make([col, hex(val), None, style])
+
+    def string(reader, recid, reclen):
+      if reader._end - reader._pos < 12:
+        return read(reader, recid, reclen)
+      col, style, val = cell_int_t.unpack_from(reader._buf, reader._pos)
+      return make([col, val, None, style])
+
+    def blank(reader, recid, reclen):
+      if reader._end - reader._pos < 8:
+        return read(reader, recid, reclen)
+      col, style = cell_t.unpack_from(reader._buf, reader._pos)
+      return make([col, None, None, style])
+
+    self._decoders = {
+      biff12.BLANK:           blank,
+      biff12.NUM:             rk,
+      biff12.BOOLERR:         error,
+      biff12.BOOL:            boolean,
+      biff12.FLOAT:           double,
+      biff12.STRING:          string,
+      biff12.FORMULA_FLOAT:   double,
+      biff12.FORMULA_BOOL:    boolean,
+      biff12.FORMULA_BOOLERR: error
+    }
+
+  def decoder(self, recid):
+    # Subclasses overriding read() get it called for every record, the struct shortcuts would bypass it
+    if _func(type(self).read) is not _func(CellHandler.read):
+      return self.read
+    return self._decoders.get(recid, self.read)
 
   def read(self, reader, recid, reclen):
     col = reader.read_int()
@@ -128,6 +209,33 @@ class CellHandler(Handler):
     return self.cls._make([col, val, None, style])
 
 
+class FormatHandler(Handler):
+  cls = namedtuple('fmt', ['numFmtId', 'code'])
+
+  def __init__(self):
+    super(FormatHandler, self).__init__()
+
+  def read(self, reader, recid, reclen):
+    fmtid = reader.read_short()
+    code = reader.read_string()
+    return self.cls._make([fmtid, code])
+
+
+class XfHandler(Handler):
+  cls = namedtuple('xf', ['parent', 'numFmtId', 'fontId', 'fillId', 'borderId'])
+
+  def __init__(self):
+    super(XfHandler, self).__init__()
+
+  def read(self, reader, recid, reclen):
+    parent = reader.read_short()
+    fmtid = reader.read_short()
+    font = reader.read_short()
+    fill = reader.read_short()
+    border = reader.read_short()
+    return self.cls._make([parent, fmtid, font, fill, border])
+
+
 class HyperlinkHandler(Handler):
   cls = namedtuple('hyperlink', ['r', 'c', 'h', 'w', 'rId'])
 
@@ -0,0 +1,165 @@
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+if sys.version_info > (3,):
+  xrange = range
+
+DEFAULT_STEP = 1024
+
+# Typecode of part offset arrays, Python 2 has no 'Q' but its 'L' is 64 bits on LP64 platforms
+try:
+  array('Q')
+  OFFSET_TYPECODE = 'Q'
+except ValueError:
+  OFFSET_TYPECODE = 'L' if array('L').itemsize >= 8 else 'd'
+
+header_t = struct.Struct('<4sIQ?')
+
+class RowIndex(object):
+  # Sparse index of the part offset of the first ROW record in every `step` rows of a sheet
+  MAGIC = b'XRIX'
+
+  def __init__(self, step=DEFAULT_STEP, rows=None, offsets=None, complete=False):
+    super(RowIndex, self).__init__()
+    self.step = step
+    self.rows = array('I') if rows is None else rows
+    self.offsets = array(OFFSET_TYPECODE) if offsets is None else offsets
+    # Incomplete indexes get extended by whatever scan walks past their last entry
+    self.complete = complete
+
+  def __len__(self):
+    return len(self.rows)
+
+  def append(self, r, offset):
+    self.rows.append(r)
+    self.offsets.append(offset)
+
+  def note(self, r, offset):
+    # Called for every ROW passed in order, only the first row of a new block gets an entry
+    rows = self.rows
+    if not rows or r // self.step > rows[-1] // self.step:
+      rows.append(r)
+      self.offsets.append(offset)
+
+  def lookup(self, r):
+    # Closest indexed ROW at or before r, (None, None) when r comes before the first block
+    i = bisect_right(self.rows, r) - 1
+    if i < 0:
+      return None, None
+    return self.rows[i], self.offsets[i]
+
+  def blocks(self, count):
+    # First row of at most `count` evenly sized runs of blocks, for splitting a sheet into ranges
+    n = len(self.rows)
+    if n == 0 or count < 1:
+      return []
+    per = max(1, -(-n // count))
+    return [self.rows[i] for i in range(0, n, per)]
+
+  def dump(self, fp):
+    # Packed explicitly, array.tofile() wants a real file on Python 2 and the offset typecode varies
+    count = len(self.rows)
+    fp.write(header_t.pack(self.MAGIC, self.step, count, self.complete))
+    fp.write(struct.pack('<{}I'.format(count), *self.rows))
+    fp.write(struct.pack('<{}Q'.format(count), *[int(offset) for offset in self.offsets]))
+
+  @classmethod
+  def load(cls, fp):
+    magic, step, count, complete = header_t.unpack(fp.read(header_t.size))
+    if magic != cls.MAGIC:
+      raise ValueError('not a row index')
+    rows = array('I', struct.unpack('<{}I'.format(count), fp.read(4 * count)))
+    offsets = array(OFFSET_TYPECODE, struct.unpack('<{}Q'.format(count), fp.read(8 * count)))
+    return cls(step, rows, offsets, complete)
+
+
+class RangeIndex(object):
+  # Rectangular cell ranges (r1, c1, r2, c2, value), inclusive, in a centered interval tree over their rows
+  def __init__(self, ranges=()):
+    super(RangeIndex, self).__init__()
+    self.ranges = list(ranges)
+    self._root = self._build([rng + (seq,) for seq, rng in enumerate(self.ranges)])
+
+  def _build(self, ranges):
+    # Nodes are (center row, ranges over it by first row, same by last row descending, left, right)
+    if not ranges:
+      return None
+    starts = sorted(rng[0] for rng in ranges)
+    center = starts[len(starts) // 2]
+    left = [rng for rng in ranges if rng[2] < center]
+    right = [rng for rng in ranges if rng[0] > center]
+    mid = [rng for rng in ranges if rng[0] <= center <= rng[2]]
+    return (center, sorted(mid, key=lambda rng: rng[0]), sorted(mid, key=lambda rng: -rng[2]),
+            self._build(left), self._build(right))
+
+  def __len__(self):
+    return len(self.ranges)
+
+  def __iter__(self):
+    return iter(self.ranges)
+
+  def _matches(self, r, c):
+    node = self._root
+    while node is not None:
+      center, by_start, by_end, left, right = node
+      if r < center:
+        for rng in by_start:
+          if rng[0] > r:
+            break
+          if rng[1] <= c <= rng[3]:
+            yield rng
+        node = left
+      elif r > center:
+        for rng in by_end:
+          if rng[2] < r:
+            break
+          if rng[1] <= c <= rng[3]:
+            yield rng
+        node = right
+      else:
+        for rng in by_start:
+          if rng[1] <= c <= rng[3]:
+            yield rng
+        break
+
+  def find(self, r, c):
+    # Values of every range covering the cell, in the order they were added
+    return [rng[4] for rng in sorted(self._matches(r, c), key=lambda rng: rng[5])]
+
+  def _winner(self, r, c):
+    # Where ranges overlap the last one added wins
+    best = None
+    for rng in self._matches(r, c):
+      if best is None or rng[5] > best[5]:
+        best = rng
+    return best
+
+  def get(self, key, default=None):
+    best = self._winner(key[0], key[1])
+    return best[4] if best is not None else default
+
+  def __getitem__(self, key):
+    ret = self.get(key, self)
+    if ret is self:
+      raise KeyError(key)
+    return ret
+
+  def __contains__(self, key):
+    return self.get(key, self) is not self
+
+  def items(self):
+    # ((r, c), value) of every covered cell, like a dict keyed by cell would hold them. Ranges get
+    # expanded lazily, a whole-column range still means a million cells
+    for seq, (r1, c1, r2, c2, value) in enumerate(self.ranges):
+      for r in xrange(r1, r2 + 1):
+        for c in xrange(c1, c2 + 1):
+          if self._winner(r, c)[5] == seq:
+            yield (r, c), value
+
+  def keys(self):
+    return (key for key, _ in self.items())
+
+  def values(self):
+    return (value for _, value in self.items())
@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+
+timer = getattr(time, 'perf_counter', time.time)
+
+class Instrumentation(object):
+  # Collects counters handed out by the readers, subclass and override the hooks to forward them elsewhere
+  def __init__(self):
+    super(Instrumentation, self).__init__()
+    self.reset()
+
+  def reset(self):
+    # recid -> [count, bytes, decode seconds]
+    self.records = {}
+    self.timings = {}
+    self.counters = {}
+
+  def record(self, recid, size, seconds=0.0):
+    stats = self.records.get(recid)
+    if stats is None:
+      stats = self.records[recid] = [0, 0, 0.0]
+    stats[0] += 1
+    stats[1] += size
+    stats[2] += seconds
+
+  def add_time(self, name, seconds):
+    self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+  def count(self, name, n=1):
+    self.counters[name] = self.counters.get(name, 0) + n
+
+  @contextmanager
+  def timed(self, name):
+    start = timer()
+    try:
+      yield
+    finally:
+      self.add_time(name, timer() - start)
+
+  def iterate(self, name, it, size=None):
+    # Only the time spent producing items is counted, not the time the consumer holds on to them
+    it = iter(it)
+    while True:
+      start = timer()
+      try:
+        item = next(it)
+      except StopIteration:
+        self.add_time(name, timer() - start)
+        return
+      self.add_time(name, timer() - start)
+      self.count(name, size(item) if size is not None else 1)
+      yield item
+
+  def report(self):
+    rates = {}
+    for name, n in self.counters.items():
+      seconds = self.timings.get(name)
+      if seconds:
+        rates[name] = n / seconds
+    return {
+      'records': dict((recid, {'count': v[0], 'bytes': v[1], 'seconds': v[2]}) for recid, v in self.records.items()),
+      'timings': dict(self.timings),
+      'counters': dict(self.counters),
+      'rates': rates
+    }
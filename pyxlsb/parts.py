@@ -0,0 +1,179 @@
+import mmap
+import os
+import shutil
+import sys
+from tempfile import TemporaryFile
+
+COPY_BUFSIZE = 1 << 20
+
+STORAGE_FILE = 'file'
+STORAGE_MMAP = 'mmap'
+STORAGE_MEMORY = 'memory'
+STORAGES = (STORAGE_FILE, STORAGE_MMAP, STORAGE_MEMORY)
+
+def _readable(data):
+  # Python 2 indexes str into characters, readers can only scan a part in place from a bytearray there
+  return data if sys.version_info > (3,) else bytearray(data)
+
+def spool(zf, name, storage=STORAGE_FILE, instrument=None):
+  if storage not in STORAGES:
+    raise ValueError('unknown storage backend: {!r}'.format(storage))
+  if storage == STORAGE_MEMORY:
+    if instrument is not None:
+      with instrument.timed('zip.inflate'):
+        return BufferFile(_readable(zf.read(name)))
+    return BufferFile(_readable(zf.read(name)))
+  temp = TemporaryFile()
+  try:
+    with zf.open(name, 'r') as part:
+      if instrument is not None:
+        _timed_copy(part, temp, instrument)
+      else:
+        shutil.copyfileobj(part, temp, COPY_BUFSIZE)
+    temp.seek(0, os.SEEK_SET)
+  except Exception:
+    temp.close()
+    raise
+  if storage == STORAGE_MMAP:
+    return MappedFile(temp)
+  return temp
+
+
+def _timed_copy(src, dst, instrument):
+  # Same as copyfileobj, with inflating and writing the temporary file timed apart
+  from .instrument import timer
+  inflate = write = 0.0
+  size = 0
+  while True:
+    start = timer()
+    data = src.read(COPY_BUFSIZE)
+    mid = timer()
+    inflate += mid - start
+    if not data:
+      break
+    dst.write(data)
+    write += timer() - mid
+    size += len(data)
+  instrument.add_time('zip.inflate', inflate)
+  instrument.add_time('spool.write', write)
+  instrument.count('spool.bytes', size)
+
+
+class BufferFile(object):
+  # Read-only file over an in-memory buffer, readers use getbuffer() to slice it without copying
+  def __init__(self, buf):
+    super(BufferFile, self).__init__()
+    self._buf = buf
+    self._pos = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, type, value, traceback):
+    self.close()
+
+  def getbuffer(self):
+    return self._buf
+
+  def tell(self):
+    return self._pos
+
+  def seek(self, offset, whence=os.SEEK_SET):
+    if whence == os.SEEK_CUR:
+      offset += self._pos
+    elif whence == os.SEEK_END:
+      offset += len(self._buf)
+    self._pos = max(offset, 0)
+    return self._pos
+
+  def read(self, size=-1):
+    pos = self._pos
+    end = len(self._buf) if size is None or size < 0 else min(pos + size, len(self._buf))
+    if end <= pos:
+      return b''
+    self._pos = end
+    # Callers like the XML parser want bytes, the buffer is a bytearray on Python 2
+    return bytes(self._buf[pos:end])
+
+  def close(self):
+    self._buf = b''
+
+
+class MappedFile(BufferFile):
+  def __init__(self, fp):
+    fp.seek(0, os.SEEK_END)
+    if fp.tell() > 0:
+      self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+      super(MappedFile, self).__init__(self._map)
+    else:
+      # Zero-length files can't be mapped
+      self._map = None
+      super(MappedFile, self).__init__(b'')
+    self._fp = fp
+
+  def close(self):
+    super(MappedFile, self).close()
+    if self._map is not None:
+      self._map.close()
+      self._map = None
+    self._fp.close()
+
+
+class PartStream(object):
+  # Forward-only view of a ZIP member, only spooled when something seeks backwards
+  def __init__(self, zf, name, storage=STORAGE_FILE, instrument=None):
+    super(PartStream, self).__init__()
+    self._zf = zf
+    self._name = name
+    self._storage = storage
+    self._instrument = instrument
+    self._fp = zf.open(name, 'r')
+    self._pos = 0
+    self._spooled = False
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, type, value, traceback):
+    self.close()
+
+  @property
+  def spooled(self):
+    return self._spooled
+
+  def _spool(self):
+    temp = spool(self._zf, self._name, self._storage, self._instrument)
+    self._fp.close()
+    self._fp = temp
+    self._spooled = True
+
+  def tell(self):
+    if self._spooled:
+      return self._fp.tell()
+    return self._pos
+
+  def seek(self, offset, whence=os.SEEK_SET):
+    if not self._spooled:
+      if whence == os.SEEK_CUR:
+        offset += self._pos
+        whence = os.SEEK_SET
+      if whence == os.SEEK_SET and offset >= self._pos:
+        while self._pos < offset:
+          if not self.read(min(offset - self._pos, COPY_BUFSIZE)):
+            break
+        return self._pos
+      self._spool()
+    return self._fp.seek(offset, whence)
+
+  def read(self, size=-1):
+    if self._instrument is not None and not self._spooled:
+      with self._instrument.timed('zip.inflate'):
+        data = self._fp.read(size)
+    else:
+      data = self._fp.read(size)
+    if not self._spooled:
+      self._pos += len(data)
+    return data
+
+  def close(self):
+    self._fp.close()
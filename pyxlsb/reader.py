@@ -1,8 +1,10 @@
-import io
 import os
 import struct
+import sys
 from . import biff12
 from .handlers import *
+from .instrument import timer
+from .parts import BufferFile
 
 uint8_t = struct.Struct('<B')
 uint16_t = struct.Struct('<H')
@@ -10,53 +12,81 @@ int32_t = struct.Struct('<i')
 uint32_t = struct.Struct('<I')
 double_t = struct.Struct('<d')
 
+DEFAULT_BUFSIZE = 1 << 20
+
+PY3 = sys.version_info > (3,)
+
+# Record ids below this get a slot in the dense dispatch list, anything above goes through a dict
+DISPATCH_SIZE = 1 << 16
+
 class RecordReader(object):
-  def __init__(self, buf, enc='utf-16'):
-    self._fp = io.BytesIO(buf)
+  def __init__(self, buf, offset=0, size=None, enc='utf-16'):
     self._enc = enc
+    self.reset(buf, offset, size)
 
   def __enter__(self):
     return self
 
   def __exit__(self, type, value, traceback):
-    self._fp.close()
+    pass
+
+  def reset(self, buf, offset=0, size=None):
+    # Points the reader at a record living inside a shared buffer, nothing gets copied
+    self._buf = buf
+    self._start = offset
+    self._pos = offset
+    self._end = len(buf) if size is None else min(offset + size, len(buf))
 
   def tell(self):
-    return self._fp.tell()
+    return self._pos - self._start
 
   def seek(self, offset, whence=os.SEEK_SET):
-    self._fp.seek(offset, whence)
+    if whence == os.SEEK_CUR:
+      self._pos = max(self._pos + offset, self._start)
+    elif whence == os.SEEK_END:
+      self._pos = max(self._end + offset, self._start)
+    else:
+      self._pos = self._start + max(offset, 0)
 
   def skip(self, size):
-    self._fp.seek(size, os.SEEK_CUR)
+    self._pos += size
 
   def read(self, size):
-    return self._fp.read(size)
+    pos = self._pos
+    end = min(pos + size, self._end)
+    if end <= pos:
+      return b''
+    self._pos = end
+    return bytes(self._buf[pos:end])
 
   def read_int(self):
-    buff = self._fp.read(4)
-    if len(buff) < 4:
+    pos = self._pos
+    self._pos = pos + 4
+    if self._pos > self._end:
       return None
-    return uint32_t.unpack(buff)[0]
+    return uint32_t.unpack_from(self._buf, pos)[0]
 
   def read_short(self):
-    buff = self._fp.read(2)
-    if len(buff) < 2:
+    pos = self._pos
+    self._pos = pos + 2
+    if self._pos > self._end:
       return None
-    return uint16_t.unpack(buff)[0]
+    return uint16_t.unpack_from(self._buf, pos)[0]
 
   def read_byte(self):
-    byte = self._fp.read(1)
-    if not byte:
+    pos = self._pos
+    self._pos = pos + 1
+    if self._pos > self._end:
       return None
-    return uint8_t.unpack(byte)[0]
+    return uint8_t.unpack_from(self._buf, pos)[0]
 
   def read_float(self):
-    buff = self._fp.read(4)
-    if len(buff) < 4:
+    pos = self._pos
+    self._pos = pos + 4
+    if self._pos > self._end:
       return None
     v = 0.0
-    intval = int32_t.unpack(buff)[0]
+    intval = int32_t.unpack_from(self._buf, pos)[0]
     if intval & 0x02 != 0:
       v = float(intval >> 2)
     else:
@@ -66,19 +96,21 @@ class RecordReader(object):
     return v
 
   def read_double(self):
-    buff = self._fp.read(8)
-    if len(buff) < 8:
+    pos = self._pos
+    self._pos = pos + 8
+    if self._pos > self._end:
       return None
-    return double_t.unpack(buff)[0]
+    return double_t.unpack_from(self._buf, pos)[0]
 
   def read_string(self):
     l = self.read_int()
     if l is None:
       return None
-    buff = self.read(l * 2)
-    if len(buff) < l * 2:
+    pos = self._pos
+    self._pos = pos + l * 2
+    if self._pos > self._end:
       return None
-    return buff.decode(self._enc, errors='replace')
+    return self._buf[pos:self._pos].decode(self._enc, errors='replace')
 
 
 class BIFF12Reader(object):
@@ -94,6 +126,18 @@ class BIFF12Reader(object):
     biff12.SST_END: BasicHandler('/sst'),
     biff12.SI:      StringInstanceHandler(),
 
+    # Styles part handlers
+    biff12.STYLESHEET:       BasicHandler('styleSheet'),
+    biff12.STYLESHEET_END:   BasicHandler('/styleSheet'),
+    biff12.FMTS:             BasicHandler('numFmts'),
+    biff12.FMTS_END:         BasicHandler('/numFmts'),
+    biff12.FMT:              FormatHandler(),
+    biff12.CELLSTYLEXFS:     BasicHandler('cellStyleXfs'),
+    biff12.CELLSTYLEXFS_END: BasicHandler('/cellStyleXfs'),
+    biff12.CELLXFS:          BasicHandler('cellXfs'),
+    biff12.CELLXFS_END:      BasicHandler('/cellXfs'),
+    biff12.XF:               XfHandler(),
+
     # Worksheet part handlers
     biff12.WORKSHEET:       BasicHandler('worksheet'),
     biff12.WORKSHEET_END:   BasicHandler('/worksheet'),
@@ -117,10 +161,30 @@ class BIFF12Reader(object):
     biff12.HYPERLINK:       HyperlinkHandler()
   }
 
-  def __init__(self, fp, debug=False):
+  def __init__(self, fp, debug=False, bufsize=DEFAULT_BUFSIZE, instrument=None):
     super(BIFF12Reader, self).__init__()
     self._debug = debug
+    self._instrument = instrument
     self._fp = fp
+    self._bufsize = bufsize
+    if isinstance(fp, BufferFile) and (PY3 or isinstance(fp.getbuffer(), bytearray)):
+      # In-memory and mmap'd parts are scanned in place, no chunk ever gets copied. Python 2 only does
+      # this for bytearrays, indexing str or mmap there gives characters, those get read in chunks instead
+      self._mapped = True
+      self._buf = fp.getbuffer()
+      self._buf_offset = 0
+    else:
+      self._mapped = False
+      self._buf = bytearray()
+      self._buf_offset = fp.tell()
+    self._pos = fp.tell() - self._buf_offset
+    self._record = RecordReader(self._buf, 0, 0)
+    self.record_offset = self.tell()
+    self._build_dispatch()
+    if instrument is not None:
+      # Swapped in per instance so readers without instrumentation keep the plain methods
+      self.read_record = self._counted_read_record
+      self.next = self._timed_next
 
   def __iter__(self):
     return self
@@ -134,53 +198,181 @@ class BIFF12Reader(object):
   def __exit__(self, type, value, traceback):
     self.close()
 
+  def _fill(self, size):
+    # Make sure at least `size` bytes are buffered past the cursor, short only at EOF
+    buf = self._buf
+    avail = len(buf) - self._pos
+    if avail >= size or self._mapped:
+      return avail
+    del buf[:self._pos]
+    self._buf_offset += self._pos
+    self._pos = 0
+    while avail < size:
+      data = self._fp.read(max(self._bufsize, size - avail))
+      if not data:
+        break
+      buf += data
+      avail += len(data)
+    return avail
+
   def tell(self):
-    return self._fp.tell()
+    return self._buf_offset + self._pos
 
   def seek(self, offset, whence=os.SEEK_SET):
-    self._fp.seek(offset, whence)
+    if whence == os.SEEK_CUR:
+      offset += self.tell()
+    elif whence != os.SEEK_SET:
+      self._fp.seek(offset, whence)
+      offset = self._fp.tell()
+    if self._mapped or self._buf_offset <= offset <= self._buf_offset + len(self._buf):
+      self._pos = offset - self._buf_offset
+    else:
+      self._fp.seek(offset, os.SEEK_SET)
+      del self._buf[:]
+      self._buf_offset = offset
+      self._pos = 0
 
   def read_id(self):
+    self._fill(4)
+    buf = self._buf
+    pos = self._pos
     v = 0
     for i in range(4):
-      byte = self._fp.read(1)
-      if not byte:
+      if pos >= len(buf):
         return None
-      byte = uint8_t.unpack(byte)[0]
+      byte = buf[pos]
+      pos += 1
       v += byte << 8 * i
       if byte & 0x80 == 0:
         break
+    self._pos = pos
     return v
 
   def read_len(self):
+    self._fill(4)
+    buf = self._buf
+    pos = self._pos
     v = 0
     for i in range(4):
-      byte = self._fp.read(1)
-      if not byte:
+      if pos >= len(buf):
         return None
-      byte = uint8_t.unpack(byte)[0]
+      byte = buf[pos]
+      pos += 1
       v += (byte & 0x7F) << (7 * i)
       if byte & 0x80 == 0:
         break
+    self._pos = pos
     return v
 
+  def _build_dispatch(self):
+    # Handlers resolved to their decoders once, unknown records get no entry and are skipped without a call
+    ids = [recid for recid in self.handlers if recid < DISPATCH_SIZE]
+    self._dispatch = [None] * (max(ids) + 1 if ids else 0)
+    self._far = {}
+    for recid, handler in self.handlers.items():
+      self._set_decoder(recid, handler)
+
+  def _set_decoder(self, recid, handler):
+    decode = None
+    if handler is not None:
+      # Duck-typed handlers may only have read()
+      decoder = getattr(handler, 'decoder', None)
+      decode = decoder(recid) if decoder is not None else handler.read
+    if recid < DISPATCH_SIZE:
+      if recid >= len(self._dispatch):
+        self._dispatch.extend([None] * (recid + 1 - len(self._dispatch)))
+      self._dispatch[recid] = decode
+    elif decode is None:
+      self._far.pop(recid, None)
+    else:
+      self._far[recid] = decode
+
+  def decoder(self, recid):
+    if recid < len(self._dispatch):
+      return self._dispatch[recid]
+    return self._far.get(recid)
+
   def register_handler(self, recid, handler):
+    # Only for this reader, the class-level table is shared with every other one and stays as is
+    if 'handlers' not in self.__dict__:
+      self.handlers = dict(self.handlers)
     self.handlers[recid] = handler
+    self._set_decoder(recid, handler)
+
+  def _read_header(self):
+    # Decodes both varints straight out of the buffer, a record header is at most 8 bytes
+    if len(self._buf) - self._pos < 8:
+      self._fill(8)
+    buf = self._buf
+    pos = self._pos
+    end = len(buf)
+    recid = 0
+    for shift in (0, 8, 16, 24):
+      if pos >= end:
+        return None, None
+      byte = buf[pos]
+      pos += 1
+      recid += byte << shift
+      if byte & 0x80 == 0:
+        break
+    reclen = 0
+    for shift in (0, 7, 14, 21):
+      if pos >= end:
+        return None, None
+      byte = buf[pos]
+      pos += 1
+      reclen += (byte & 0x7F) << shift
+      if byte & 0x80 == 0:
+        break
+    self._pos = pos
+    return recid, reclen
+
+  def read_record(self):
+    # Low-level scan: returns (recid, reclen, reader) with the shared reader pointed at the record data
+    self.record_offset = self._buf_offset + self._pos
+    recid, reclen = self._read_header()
+    if recid is None:
+      return None, None, None
+    if len(self._buf) - self._pos < reclen:
+      self._fill(reclen)
+    reader = self._record
+    reader.reset(self._buf, self._pos, reclen)
+    self._pos = reader._end
+    return recid, reclen, reader
 
   def next(self):
+    dispatch = self._dispatch
+    size = len(dispatch)
     ret = None
     while ret is None:
       if self._debug:
-        pos = self._fp.tell()
-      recid = self.read_id()
-      reclen = self.read_len()
-      if recid is None or reclen is None:
+        pos = self.tell()
+      recid, reclen, reader = self.read_record()
+      if recid is None:
         raise StopIteration
-      recdata = self._fp.read(reclen)
-      with RecordReader(recdata) as reader:
-        ret = (self.handlers.get(recid) or Handler()).read(reader, recid, reclen)
+      decode = dispatch[recid] if recid < size else self._far.get(recid)
+      ret = decode(reader, recid, reclen) if decode is not None else None
       if self._debug:
-        print('{:08X}  {:04X}  {:<6} {} {}'.format(pos, recid, reclen, ' '.join('{:02X}'.format(b) for b in recdata), ret))
+        print('{:08X}  {:04X}  {:<6} {} {}'.format(pos, recid, reclen, ' '.join('{:02X}'.format(b) for b in self._buf[reader._start:reader._end]), ret))
+    return (recid, ret)
+
+  def _counted_read_record(self):
+    recid, reclen, reader = BIFF12Reader.read_record(self)
+    if recid is not None:
+      self._instrument.record(recid, reclen)
+    return recid, reclen, reader
+
+  def _timed_next(self):
+    instrument = self._instrument
+    ret = None
+    while ret is None:
+      recid, reclen, reader = BIFF12Reader.read_record(self)
+      if recid is None:
+        raise StopIteration
+      decode = self.decoder(recid)
+      start = timer()
+      ret = decode(reader, recid, reclen) if decode is not None else None
+      instrument.record(recid, reclen, timer() - start)
     return (recid, ret)
 
   def close(self):
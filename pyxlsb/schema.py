@@ -0,0 +1,55 @@
+from . import biff12
+from collections import namedtuple
+
+# Column types, named after their Arrow/NumPy counterparts
+NULL     = 'null'
+FLOAT64  = 'float64'
+BOOL     = 'bool'
+STRING   = 'string'
+DATETIME = 'datetime'
+MIXED    = 'mixed'
+
+NUMERIC_RECORDS = (biff12.NUM, biff12.FLOAT, biff12.FORMULA_FLOAT)
+BOOL_RECORDS    = (biff12.BOOL, biff12.FORMULA_BOOL)
+STRING_RECORDS  = (biff12.STRING, biff12.FORMULA_STRING)
+ERROR_RECORDS   = (biff12.BOOLERR, biff12.FORMULA_BOOLERR)
+
+Field = namedtuple('Field', ['name', 'c', 'type', 'nullable', 'counts'])
+
+class ColumnStats(object):
+  # Record-type histogram of one column, indexed by record id (cell ids are all below 0x0C)
+  __slots__ = ('counts', 'dates')
+
+  def __init__(self):
+    self.counts = [0] * (biff12.FORMULA_BOOLERR + 1)
+    self.dates = 0
+
+  def total(self, recids):
+    counts = self.counts
+    return sum(counts[recid] for recid in recids)
+
+
+def resolve_type(stats):
+  numbers = stats.total(NUMERIC_RECORDS)
+  bools = stats.total(BOOL_RECORDS)
+  strings = stats.total(STRING_RECORDS)
+  kinds = sum(1 for n in (numbers, bools, strings) if n > 0)
+  if kinds == 0:
+    return NULL
+  elif kinds > 1:
+    return MIXED
+  elif numbers:
+    return DATETIME if stats.dates == numbers else FLOAT64
+  elif bools:
+    return BOOL
+  return STRING
+
+def build_schema(stats, rows, names=None):
+  names = names or {}
+  fields = []
+  for c in sorted(stats):
+    col = stats[c]
+    values = col.total(NUMERIC_RECORDS + BOOL_RECORDS + STRING_RECORDS)
+    name = names.get(c)
+    fields.append(Field(name if name is not None else str(c), c, resolve_type(col), values < rows, list(col.counts)))
+  return fields
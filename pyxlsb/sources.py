@@ -0,0 +1,130 @@
+import io
+import os
+from collections import OrderedDict
+
+DEFAULT_BLOCK_SIZE = 1 << 16
+# Blocks fetched at once at most, read-ahead doubles up to this while reads stay sequential
+DEFAULT_READAHEAD = 16
+DEFAULT_CACHE_BLOCKS = 64
+
+class RangeReader(object):
+  # Source of byte ranges of a workbook, e.g. ranged GETs against an object store
+  def size(self):
+    raise NotImplementedError
+
+  def read_range(self, offset, length):
+    raise NotImplementedError
+
+  def close(self):
+    pass
+
+
+class LocalRangeReader(RangeReader):
+  # Stand-in over a local file, keeps count of what a remote store would have to send
+  def __init__(self, path):
+    super(LocalRangeReader, self).__init__()
+    self._fp = open(path, 'rb')
+    self.requests = 0
+    self.bytes_read = 0
+
+  def size(self):
+    return os.fstat(self._fp.fileno()).st_size
+
+  def read_range(self, offset, length):
+    self._fp.seek(offset, os.SEEK_SET)
+    data = self._fp.read(length)
+    self.requests += 1
+    self.bytes_read += len(data)
+    return data
+
+  def close(self):
+    self._fp.close()
+
+
+class RangeFile(io.RawIOBase):
+  # Seekable read-only file over a RangeReader, only the blocks actually read get fetched and a few are kept around
+  def __init__(self, reader, block_size=DEFAULT_BLOCK_SIZE, readahead=DEFAULT_READAHEAD, cache_blocks=DEFAULT_CACHE_BLOCKS):
+    super(RangeFile, self).__init__()
+    self._reader = reader
+    self._size = reader.size()
+    self._block_size = block_size
+    self._readahead = max(readahead, 1)
+    self._cache_blocks = max(cache_blocks, self._readahead)
+    self._blocks = OrderedDict()
+    self._pos = 0
+    self._next = None
+    self._run = 1
+    self.requests = 0
+    self.bytes_fetched = 0
+
+  def readable(self):
+    return True
+
+  def seekable(self):
+    return True
+
+  def tell(self):
+    return self._pos
+
+  def seek(self, offset, whence=os.SEEK_SET):
+    if whence == os.SEEK_CUR:
+      offset += self._pos
+    elif whence == os.SEEK_END:
+      offset += self._size
+    if offset < 0:
+      raise ValueError('negative seek position {}'.format(offset))
+    self._pos = offset
+    return offset
+
+  def _fetch(self, idx):
+    # Sequential misses fetch growing runs of blocks in one request, anything else a single block
+    self._run = min(self._run * 2, self._readahead) if idx == self._next else 1
+    last = (self._size - 1) // self._block_size
+    count = 1
+    while count < self._run and idx + count <= last and idx + count not in self._blocks:
+      count += 1
+    offset = idx * self._block_size
+    data = self._reader.read_range(offset, min(count * self._block_size, self._size - offset))
+    self.requests += 1
+    self.bytes_fetched += len(data)
+    blocks = self._blocks
+    for i in range(count):
+      blocks[idx + i] = data[i * self._block_size:(i + 1) * self._block_size]
+    while len(blocks) > self._cache_blocks:
+      blocks.popitem(last=False)
+    self._next = idx + count
+    return blocks[idx]
+
+  def _block(self, idx):
+    block = self._blocks.pop(idx, None)
+    if block is None:
+      return self._fetch(idx)
+    self._blocks[idx] = block
+    return block
+
+  def read(self, size=-1):
+    end = self._size if size is None or size < 0 else min(self._pos + size, self._size)
+    parts = []
+    pos = self._pos
+    while pos < end:
+      idx, start = divmod(pos, self._block_size)
+      block = self._block(idx)
+      chunk = block[start:start + end - pos]
+      if not chunk:
+        break
+      parts.append(chunk)
+      pos += len(chunk)
+    self._pos = pos
+    return b''.join(parts)
+
+  def close(self):
+    # The reader goes along with the file, like the raw stream under an io buffer
+    if not self.closed:
+      self._blocks.clear()
+      self._reader.close()
+    super(RangeFile, self).close()
+
+  def readinto(self, b):
+    data = self.read(len(b))
+    b[:len(data)] = data
+    return len(data)
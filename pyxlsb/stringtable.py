@@ -1,12 +1,45 @@
+import os
+import threading
 from . import biff12
+from .index import OFFSET_TYPECODE
 from .reader import BIFF12Reader
+from array import array
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 1 << 16
+# Read size of the lazy table's reader once the offsets are known
+LOOKUP_BUFSIZE = 1 << 10
+
+# Readers blocked on a background load get woken up every this many strings
+NOTIFY_EVERY = 1024
 
 class StringTable(object):
-  def __init__(self, fp):
+  def __init__(self, fp, lazy=False, cache_size=DEFAULT_CACHE_SIZE, offsets=None, instrument=None, background=False):
     super(StringTable, self).__init__()
-    self._reader = BIFF12Reader(fp=fp)
+    self._lazy = lazy
     self._strings = []
-    self._parse()
+    # Lazy mode only keeps the offset of each SI record and a bounded LRU of decoded strings
+    self._offsets = None
+    if lazy:
+      self._offsets = array(OFFSET_TYPECODE) if offsets is None else offsets
+    self._cache = OrderedDict()
+    self._cache_size = cache_size
+    self._lock = threading.Lock()
+    self._instrument = instrument
+    self._reader = None
+    self._loading = None
+    self._thread = None
+    self._done = False
+    self._error = None
+    if background:
+      # `fp` is then a callable opening the part, so extracting it happens on the loading thread too
+      self._loading = threading.Condition()
+      self._thread = threading.Thread(target=self._load, args=(fp,))
+      self._thread.daemon = True
+      self._thread.start()
+    else:
+      self._reader = BIFF12Reader(fp=fp, instrument=instrument)
+      self._build()
 
   def __enter__(self):
     return self
@@ -14,18 +47,102 @@ class StringTable(object):
   def __exit__(self, type, value, traceback):
     self.close()
 
+  def __len__(self):
+    if self._loading is not None:
+      self._wait(None)
+    return len(self._offsets) if self._lazy else len(self._strings)
+
   def __getitem__(self, key):
-    return self._strings[key]
+    if self._loading is not None and (self._lazy or key < 0 or key >= len(self._strings)):
+      # Lazy tables decode through the reader the loading thread is still using, those wait for the whole scan
+      self._wait(None if self._lazy else key)
+    if not self._lazy:
+      return self._strings[key]
+    if key < 0:
+      key += len(self._offsets)
+    # Sheets read from several threads (e.g. the async API) share the reader and the LRU
+    with self._lock:
+      cache = self._cache
+      val = cache.pop(key, None)
+      if val is None:
+        val = self._decode(self._offsets[key])
+        if self._cache_size <= 0:
+          return val
+        if len(cache) >= self._cache_size:
+          cache.popitem(last=False)
+      cache[key] = val
+      return val
+
+  def _load(self, opener):
+    try:
+      self._reader = BIFF12Reader(fp=opener(), instrument=self._instrument)
+      self._build()
+    except BaseException as e:
+      self._error = e
+    with self._loading:
+      self._done = True
+      self._loading.notify_all()
+    if self._error is None:
+      self._loading = None
+
+  def _wait(self, key):
+    # Blocks until string `key` is loaded, or the whole table when key is None
+    loading = self._loading
+    if loading is None:
+      return
+    with loading:
+      while not self._done and (key is None or key < 0 or key >= len(self._strings)):
+        loading.wait()
+    if self._error is not None:
+      raise self._error
+
+  def _build(self):
+    if self._instrument is not None:
+      with self._instrument.timed('stringtable.build'):
+        self._parse()
+    else:
+      self._parse()
 
   def _parse(self):
-    for item in self._reader:
-      if item[0] == biff12.SI:
-        self._strings.append(item[1].t)
-      elif item[0] == biff12.SST_END:
-        break
+    if not self._lazy:
+      strings = self._strings
+      loading = self._loading
+      for item in self._reader:
+        if item[0] == biff12.SI:
+          strings.append(item[1].t)
+          if loading is not None and len(strings) % NOTIFY_EVERY == 0:
+            with loading:
+              loading.notify_all()
+        elif item[0] == biff12.SST_END:
+          break
+      return
+
+    reader = self._reader
+    offsets = self._offsets
+    if not offsets:
+      # Otherwise the index was handed in by the caller, e.g. from a metadata cache
+      while True:
+        pos = reader.tell()
+        recid, reclen, rec = reader.read_record()
+        if recid is None or recid == biff12.SST_END:
+          break
+        elif recid == biff12.SI:
+          offsets.append(pos)
+    # Lookups land anywhere in the part, each only needs its own record read rather than a whole chunk
+    reader._bufsize = LOOKUP_BUFSIZE
+
+  def _decode(self, offset):
+    reader = self._reader
+    reader.seek(offset, os.SEEK_SET)
+    recid, reclen, rec = reader.read_record()
+    rec.skip(1)
+    return rec.read_string()
 
   def get_string(self, idx):
-    return self._strings[idx]
+    return self[idx]
 
   def close(self):
-    self._reader.close()
+    if self._thread is not None:
+      self._thread.join()
+    if self._reader is not None:
+      self._reader.close()
@@ -0,0 +1,67 @@
+import re
+from . import biff12
+from .reader import BIFF12Reader
+
+# Built-in number formats that display dates or times, custom formats start at 164
+BUILTIN_DATE_FORMATS = frozenset(list(range(14, 23)) + list(range(27, 37)) + list(range(45, 48)) + list(range(50, 59)))
+
+# Quoted literals, escaped and padding characters, then [color]/[locale] sections, elapsed [h]/[m]/[s] are kept
+_literal_re = re.compile(r'"[^"]*"|\\.|[_*].')
+_section_re = re.compile(r'\[(?![hms]+\])[^\]]*\]', re.IGNORECASE)
+_date_re = re.compile(r'[dmyhs]', re.IGNORECASE)
+
+def is_date_format(code):
+  if code is None:
+    return False
+  code = _section_re.sub('', _literal_re.sub('', code))
+  # Only the positive number section decides how a serial value is shown
+  code = code.split(';', 1)[0]
+  if code.lower() == 'general':
+    return False
+  return _date_re.search(code) is not None
+
+
+class Styles(object):
+  def __init__(self, fp):
+    super(Styles, self).__init__()
+    self._reader = BIFF12Reader(fp=fp)
+    self.formats = {}
+    self.xfs = []
+    self._dates = bytearray()
+    self._parse()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, type, value, traceback):
+    self.close()
+
+  def _parse(self):
+    in_xfs = False
+    for item in self._reader:
+      if item[0] == biff12.FMT:
+        self.formats[item[1].numFmtId] = item[1].code
+      elif item[0] == biff12.CELLXFS:
+        in_xfs = True
+      elif item[0] == biff12.CELLXFS_END:
+        break
+      elif item[0] == biff12.XF and in_xfs:
+        self.xfs.append(item[1])
+
+    date_fmts = {}
+    for xf in self.xfs:
+      fmtid = xf.numFmtId
+      if fmtid not in date_fmts:
+        if fmtid in self.formats:
+          date_fmts[fmtid] = is_date_format(self.formats[fmtid])
+        else:
+          date_fmts[fmtid] = fmtid in BUILTIN_DATE_FORMATS
+      self._dates.append(1 if date_fmts[fmtid] else 0)
+
+  def is_date(self, style):
+    # Cell records carry the XF index in the low 24 bits of their style field
+    xf = style & 0xFFFFFF
+    return xf < len(self._dates) and self._dates[xf] != 0
+
+  def close(self):
+    self._reader.close()
@@ -1,23 +1,93 @@
 import os
+import shutil
 import sys
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
 from . import biff12
+from .parts import COPY_BUFSIZE, STORAGE_FILE, STORAGES, MappedFile, PartStream, spool
 from .reader import BIFF12Reader
 from .stringtable import StringTable
+from .styles import Styles
 from .worksheet import Worksheet
-from tempfile import TemporaryFile
+from collections import OrderedDict
 
 if sys.version_info > (3,):
   basestring = (str, bytes)
 
+# Per-process state of read_sheets() pool workers
+_worker_wb = None
+
+def _init_worker(name, stream, storage, strings_path):
+  global _worker_wb
+  from zipfile import ZipFile
+  # Columnar workers leave string indices unresolved, they never need the shared strings at all
+  stringtable = False
+  if strings_path is not None:
+    # Every worker maps the same extracted part, strings are decoded on demand instead of up front
+    stringtable = StringTable(fp=MappedFile(open(strings_path, 'rb')), lazy=True)
+  _worker_wb = Workbook(ZipFile(name, 'r'), stream=stream, storage=storage, stringtable=stringtable)
+
+def _read_sheet(args):
+  idx, columns, sparse, start, stop, index = args
+  with _worker_wb.get_sheet(idx) as sheet:
+    if not columns:
+      sheet.index = index
+      return list(sheet.rows(sparse=sparse, start=start, stop=stop))
+    ret = sheet.to_columns()
+    for col in ret.values():
+      col._stringtable = None
+    return ret
+
+class _Prefetch(threading.Thread):
+  # Opens a part in the background, errors are raised by result() on the thread that wants it
+  def __init__(self, workbook, name):
+    super(_Prefetch, self).__init__()
+    self.daemon = True
+    self._workbook = workbook
+    self._name = name
+    self._part = None
+    self._error = None
+
+  def run(self):
+    try:
+      # Always fully extracted, a prefetched stream would leave all the inflating to the reading thread
+      workbook = self._workbook
+      self._part = spool(workbook._zf, self._name, workbook._storage, workbook._instrument)
+    except BaseException as e:
+      self._error = e
+
+  def result(self):
+    self.join()
+    if self._error is not None:
+      raise self._error
+    return self._part
+
+
 class Workbook(object):
-  def __init__(self, fp, debug=False):
+  def __init__(self, fp, debug=False, stream=False, storage=STORAGE_FILE, lazy_strings=False, stringtable=None, cache=None, instrument=None, pipeline=False, prefetch=None, source=None):
     super(Workbook, self).__init__()
+    if storage not in STORAGES:
+      raise ValueError('unknown storage backend: {!r}'.format(storage))
     self._zf = fp
+    # File object the archive was opened from, ZipFile leaves those open
+    self._source = source
     self._debug = debug
+    self._stream = stream
+    self._storage = storage
+    self._lazy_strings = lazy_strings
+    self._cache = cache
+    self._instrument = instrument
+    self._pipeline = pipeline
+    self._prefetched = {}
     self._sheets = []
-    self.stringtable = None
+    # stringtable=False leaves the shared strings unparsed, cells then keep their string indices
+    self._load_strings = stringtable is not False
+    self.stringtable = stringtable if stringtable is not False else None
+    self._styles = None
     self._parse()
+    if prefetch:
+      self._prefetch(prefetch)
 
   def __enter__(self):
     return self
@@ -29,60 +99,205 @@ class Workbook(object):
   def sheets(self):
     return [v[0] for v in self._sheets]
 
+  @property
+  def styles(self):
+    # Only parsed once something needs to tell dates apart, the part is fully read and closed right away
+    if self._styles is None:
+      try:
+        temp = self._open_part('xl/styles.bin')
+      except KeyError:
+        self._styles = False
+      else:
+        with temp:
+          self._styles = Styles(fp=temp)
+    return self._styles or None
+
+  def _open_part(self, name):
+    if self._stream:
+      return PartStream(self._zf, name, self._storage, self._instrument)
+    return spool(self._zf, name, self._storage, self._instrument)
+
   def _parse(self):
+    if self._pipeline:
+      # The string table gets extracted and parsed on its own thread while the sheet list is read here
+      self._parse_strings()
+      self._parse_sheets_cached()
+    else:
+      self._parse_sheets_cached()
+      self._parse_strings()
+
+  def _parse_sheets_cached(self):
+    cache = self._cache
+    if cache is not None and cache.sheets is not None:
+      self._sheets = list(cache.sheets)
+    else:
+      self._parse_sheets()
+      if cache is not None:
+        cache.sheets = list(self._sheets)
+
+  def _parse_strings(self):
+    cache = self._cache
+    if self.stringtable is not None or not self._load_strings:
+      return
+    offsets = cache.strings if cache is not None and self._lazy_strings else None
+    if self._pipeline:
+      try:
+        self._zf.getinfo('xl/sharedStrings.bin')
+      except KeyError:
+        return
+      self.stringtable = StringTable(fp=lambda: self._open_part('xl/sharedStrings.bin'), lazy=self._lazy_strings,
+                                     offsets=offsets, instrument=self._instrument, background=True)
+    else:
+      try:
+        temp = self._open_part('xl/sharedStrings.bin')
+      except KeyError:
+        return
+      try:
+        self.stringtable = StringTable(fp=temp, lazy=self._lazy_strings, offsets=offsets, instrument=self._instrument)
+      except Exception:
+        temp.close()
+        raise
+
+  def _parse_sheets(self):
     rels = {}
     with self._zf.open('xl/_rels/workbook.bin.rels', 'r') as zf:
       for el in ET.parse(zf).getroot():
         rels[el.attrib['Id']] = el.attrib['Target']
 
-    with TemporaryFile() as temp:
-      with self._zf.open('xl/workbook.bin', 'r') as zf:
-        temp.write(zf.read())
-        temp.seek(0, os.SEEK_SET)
-      reader = BIFF12Reader(fp=temp, debug=self._debug)
+    with self._open_part('xl/workbook.bin') as temp:
+      reader = BIFF12Reader(fp=temp, debug=self._debug, instrument=self._instrument)
       for item in reader:
         if item[0] == biff12.SHEET:
           self._sheets.append((item[1].name, rels[item[1].rId]))
         elif item[0] == biff12.SHEETS_END:
           break
 
-    try:
-      temp = TemporaryFile()
-      with self._zf.open('xl/sharedStrings.bin', 'r') as zf:
-        temp.write(zf.read())
-        temp.seek(0, os.SEEK_SET)
-      self.stringtable = StringTable(fp=temp)
-    except KeyError:
-      temp.close()
-    except Exception:
-      temp.close()
-      raise
+  def _sheet_part(self, idx):
+    target = self._sheets[idx - 1][1].split('/')
+    return 'xl/{}/{}'.format(target[0], target[-1])
 
-  def get_sheet(self, idx, rels=False):
+  def _prefetch(self, sheets):
+    # Sheet parts get inflated on their own threads, zlib releases the GIL so they overlap with everything else
+    for idx in sheets:
+      idx = self._sheet_index(idx)
+      if idx in self._prefetched:
+        continue
+      fetch = _Prefetch(self, self._sheet_part(idx))
+      fetch.start()
+      self._prefetched[idx] = fetch
+
+  def _sheet_index(self, idx):
     if isinstance(idx, basestring):
       idx = [s.lower() for s, _ in self._sheets].index(idx.lower()) + 1
     if idx < 1 or idx > len(self._sheets):
       raise IndexError('sheet index out of range')
+    return idx
+
+  def get_sheet(self, idx, rels=False):
+    idx = self._sheet_index(idx)
 
     name = self._sheets[idx - 1][0]
     target = self._sheets[idx - 1][1].split('/')
 
-    temp = TemporaryFile()
-    with self._zf.open('xl/{}/{}'.format(target[0], target[-1]), 'r') as zf:
-      temp.write(zf.read())
-      temp.seek(0, os.SEEK_SET)
+    fetch = self._prefetched.pop(idx, None)
+    temp = fetch.result() if fetch is not None else self._open_part(self._sheet_part(idx))
 
     if rels:
-      rels_temp = TemporaryFile()
-      with self._zf.open('xl/{}/_rels/{}.rels'.format(target[0], target[-1]), 'r') as zf:
-        rels_temp.write(zf.read())
-        rels_temp.seek(0, os.SEEK_SET)
+      rels_temp = spool(self._zf, 'xl/{}/_rels/{}.rels'.format(target[0], target[-1]), self._storage, self._instrument)
     else:
       rels_temp = None
 
-    return Worksheet(name=name, fp=temp, rels_fp=rels_temp, stringtable=self.stringtable, debug=self._debug)
+    header = self._cache.header(name) if self._cache is not None else None
+
+    return Worksheet(name=name, fp=temp, rels_fp=rels_temp, stringtable=self.stringtable, debug=self._debug, header=header, styles=lambda: self.styles, instrument=self._instrument)
+
+  def _map_sheets(self, tasks, workers=None, columns=False):
+    if getattr(self._zf, 'filename', None) is None:
+      raise ValueError('parallel reads need a workbook opened from a file name')
+
+    # Columnar results keep string indices and get bound to our own table, rows need the strings resolved in the workers
+    strings_path = None
+    if not columns and self.stringtable is not None:
+      fd, strings_path = tempfile.mkstemp(suffix='.bin')
+      with os.fdopen(fd, 'wb') as temp, self._zf.open('xl/sharedStrings.bin', 'r') as part:
+        shutil.copyfileobj(part, temp, COPY_BUFSIZE)
+
+    from multiprocessing import Pool
+    try:
+      pool = Pool(workers, _init_worker, (self._zf.filename, self._stream, self._storage, strings_path))
+      try:
+        results = pool.map(_read_sheet, tasks)
+      finally:
+        pool.terminate()
+        pool.join()
+    finally:
+      if strings_path is not None:
+        os.remove(strings_path)
+
+    if columns:
+      for cols in results:
+        for col in cols.values():
+          col._stringtable = self.stringtable
+    return results
+
+  def read_sheets(self, names=None, workers=None, columns=False, sparse=False):
+    if names is None:
+      names = self.sheets
+    idxs = [self._sheet_index(idx) for idx in names]
+    results = self._map_sheets([(idx, columns, sparse, None, None, None) for idx in idxs], workers, columns)
+    return OrderedDict((self._sheets[idx - 1][0], ret) for idx, ret in zip(idxs, results))
+
+  def read_sheet(self, idx, workers=None, sparse=False, index=None):
+    # Splits a single sheet along its row index and decodes the ranges in parallel, rows come back in order
+    if workers is None:
+      from multiprocessing import cpu_count
+      workers = cpu_count()
+    idx = self._sheet_index(idx)
+    if index is None:
+      with self.get_sheet(idx) as sheet:
+        index = sheet.build_index()
+    bounds = index.blocks(workers * 4)
+    if not bounds:
+      return []
+    bounds[0] = 0
+    tasks = [(idx, False, sparse, start, stop, index) for start, stop in zip(bounds, bounds[1:] + [None])]
+    ret = []
+    for rows in self._map_sheets(tasks, workers):
+      ret.extend(rows)
+    return ret
+
+  def stats(self, names=None, columns=None):
+    # Column statistics of several sheets, each read once. `columns` is a list for every sheet or a dict by sheet name
+    if names is None:
+      names = self.sheets
+    ret = OrderedDict()
+    for idx in names:
+      idx = self._sheet_index(idx)
+      name = self._sheets[idx - 1][0]
+      selected = columns.get(name) if isinstance(columns, dict) else columns
+      with self.get_sheet(idx) as sheet:
+        ret[name] = sheet.stats(columns=selected)
+    return ret
 
   def close(self):
+    stringtable = self.stringtable
+    if stringtable is not None:
+      # Joins a background load, the offsets only go in the cache once they index the whole table
+      stringtable.close()
+      if self._cache is not None and self._lazy_strings and stringtable._error is None:
+        self._cache.strings = stringtable._offsets
+    if self._cache is not None:
+      try:
+        self._cache.save()
+      except (IOError, OSError):
+        # The cache is only an optimization, a read-only location shouldn't break closing the workbook
+        pass
+    for fetch in self._prefetched.values():
+      try:
+        fetch.result().close()
+      except Exception:
+        pass
+    self._prefetched.clear()
     self._zf.close()
-    if self.stringtable is not None:
-      self.stringtable.close()
+    if self._source is not None:
+      self._source.close()
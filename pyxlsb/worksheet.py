@@ -1,29 +1,275 @@
 import os
+import re
 import sys
 import xml.etree.ElementTree as ET
 from . import biff12
+from .aggregate import ColumnAggregate
+from .filters import column_index, compile_where
+from .handlers import ColumnHandler, DimensionHandler
+from .index import DEFAULT_STEP, RangeIndex, RowIndex
 from .reader import BIFF12Reader
-from collections import namedtuple
+from .schema import BOOL as SCHEMA_BOOL, STRING as SCHEMA_STRING, DATETIME, FLOAT64, ColumnStats, build_schema
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
 
 if sys.version_info > (3,):
+  basestring = (str, bytes)
   xrange = range
 
 Cell = namedtuple('Cell', ['r', 'c', 'v'])
 
+_ref_re = re.compile(r'^\$?([A-Z]*)\$?([0-9]*)$', re.IGNORECASE)
+
+def parse_range(ref):
+  # 'A1:F1000', 'B2', 'A:C' or '3:10' to zero-based inclusive (r1, c1, r2, c2), open ends are None
+  bounds = []
+  for part in ref.split(':'):
+    m = _ref_re.match(part.strip())
+    if m is None or not (m.group(1) or m.group(2)):
+      raise ValueError('invalid cell range: {!r}'.format(ref))
+    c = column_index(m.group(1)) if m.group(1) else None
+    r = int(m.group(2)) - 1 if m.group(2) else None
+    bounds.append((r, c))
+  if len(bounds) == 1:
+    bounds.append(bounds[0])
+  elif len(bounds) != 2:
+    raise ValueError('invalid cell range: {!r}'.format(ref))
+  (r1, c1), (r2, c2) = bounds
+  return r1, c1, r2, c2
+
+class Row(object):
+  # Only the populated cells of a row, as parallel column/value lists, expanded to Cells on access
+  __slots__ = ('r', 'cols', 'values', 'width')
+
+  def __init__(self, r, width=0):
+    self.r = r
+    self.cols = array('I')
+    self.values = []
+    self.width = width
+
+  def __len__(self):
+    return self.width
+
+  def __getitem__(self, c):
+    if c < 0:
+      c += self.width
+    if c < 0 or c >= self.width:
+      raise IndexError('column index out of range')
+    i = bisect_left(self.cols, c)
+    if i < len(self.cols) and self.cols[i] == c:
+      return Cell(self.r, c, self.values[i])
+    return Cell(self.r, c, None)
+
+  def __iter__(self):
+    return iter(self.to_list())
+
+  def __eq__(self, other):
+    if isinstance(other, Row):
+      return self.r == other.r and self.width == other.width and self.cols == other.cols and self.values == other.values
+    return self.to_list() == other
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __repr__(self):
+    return 'Row(r={!r}, cells={!r})'.format(self.r, list(self.cells()))
+
+  def append(self, c, v):
+    cols = self.cols
+    if not cols or c > cols[-1]:
+      cols.append(c)
+      self.values.append(v)
+    else:
+      i = bisect_left(cols, c)
+      if i < len(cols) and cols[i] == c:
+        self.values[i] = v
+      else:
+        cols.insert(i, c)
+        self.values.insert(i, v)
+    if c >= self.width:
+      self.width = c + 1
+
+  def cells(self):
+    r = self.r
+    for c, v in zip(self.cols, self.values):
+      yield Cell(r, c, v)
+
+  def to_list(self):
+    r = self.r
+    row = [Cell(r, i, None) for i in xrange(self.width)]
+    for c, v in zip(self.cols, self.values):
+      row[c] = Cell(r, c, v)
+    return row
+
+# Column value kinds
+EMPTY  = 0
+NUMBER = 1
+BOOL   = 2
+STRING = 3
+TEXT   = 4
+ERROR  = 5
+
+NAN = float('nan')
+
+DEFAULT_BATCH_SIZE = 1000
+
+NUMERIC = frozenset([biff12.NUM, biff12.FLOAT, biff12.FORMULA_FLOAT])
+
+class Column(object):
+  # Row-aligned typed buffers for a single column, the typed arrays are only allocated once a value of that kind shows up
+  def __init__(self, c, r, size, stringtable=None):
+    super(Column, self).__init__()
+    self.c = c
+    self.r = r
+    self.kinds = bytearray(size)
+    self.numbers = None
+    self.bools = None
+    self.strings = None
+    self.dates = None
+    self.text = {}
+    self.errors = {}
+    self._stringtable = stringtable
+
+  def __len__(self):
+    return len(self.kinds)
+
+  def __getitem__(self, idx):
+    kind = self.kinds[idx]
+    if kind == NUMBER:
+      return self.numbers[idx]
+    elif kind == BOOL:
+      return self.bools[idx] != 0
+    elif kind == STRING:
+      if self._stringtable is not None:
+        return self._stringtable[self.strings[idx]]
+      return self.strings[idx]
+    elif kind == TEXT:
+      return self.text[idx]
+    elif kind == ERROR:
+      return self.errors[idx]
+    return None
+
+  def __iter__(self):
+    for idx in xrange(len(self.kinds)):
+      yield self[idx]
+
+  def _resize(self, size):
+    grow = size - len(self.kinds)
+    self.kinds.extend(bytearray(grow))
+    if self.numbers is not None:
+      self.numbers.extend(array('d', [NAN]) * grow)
+    if self.bools is not None:
+      self.bools.extend(array('b', [0]) * grow)
+    if self.strings is not None:
+      self.strings.extend(array('i', [-1]) * grow)
+    if self.dates is not None:
+      self.dates.extend(bytearray(grow))
+
+  def _allocate(self, type):
+    size = len(self.kinds)
+    if type == FLOAT64 or type == DATETIME:
+      self.numbers = array('d', [NAN]) * size
+      if type == DATETIME:
+        self.dates = bytearray(size)
+    elif type == SCHEMA_BOOL:
+      self.bools = array('b', [0]) * size
+    elif type == SCHEMA_STRING:
+      self.strings = array('i', [-1]) * size
+
+  def _set(self, idx, recid, rec, styles=None):
+    # Decodes a cell record positioned right after its column field into row `idx`
+    if idx >= len(self.kinds):
+      self._resize(idx + 1)
+    style = rec.read_int()
+    if recid == biff12.NUM or recid == biff12.FLOAT or recid == biff12.FORMULA_FLOAT:
+      if self.numbers is None:
+        self.numbers = array('d', [NAN]) * len(self.kinds)
+      self.numbers[idx] = rec.read_float() if recid == biff12.NUM else rec.read_double()
+      self.kinds[idx] = NUMBER
+      if styles is not None and styles.is_date(style):
+        if self.dates is None:
+          self.dates = bytearray(len(self.kinds))
+        self.dates[idx] = 1
+    elif recid == biff12.BOOL or recid == biff12.FORMULA_BOOL:
+      if self.bools is None:
+        self.bools = array('b', [0]) * len(self.kinds)
+      self.bools[idx] = rec.read_byte() != 0
+      self.kinds[idx] = BOOL
+    elif recid == biff12.STRING:
+      if self.strings is None:
+        self.strings = array('i', [-1]) * len(self.kinds)
+      self.strings[idx] = rec.read_int()
+      self.kinds[idx] = STRING
+    elif recid == biff12.FORMULA_STRING:
+      self.text[idx] = rec.read_string()
+      self.kinds[idx] = TEXT
+    elif recid == biff12.BOOLERR or recid == biff12.FORMULA_BOOLERR:
+      self.errors[idx] = hex(rec.read_byte())
+      self.kinds[idx] = ERROR
+
+  def mask(self, kind=None):
+    # Validity mask as a bytearray of 0/1, for a given kind or for any value when kind is None
+    table = bytearray(256) if kind is not None else bytearray(b'\x01') * 256
+    if kind is not None:
+      table[kind] = 1
+    else:
+      table[EMPTY] = 0
+    return self.kinds.translate(table)
+
+  def to_numpy(self, kind=NUMBER):
+    # Zero-copy views over the typed buffers, numpy is only needed when this gets called
+    import numpy as np
+    mask = np.frombuffer(self.mask(kind), dtype=np.uint8).astype(bool)
+    if kind == NUMBER:
+      if self.numbers is None:
+        return np.full(len(self.kinds), np.nan), mask
+      return np.frombuffer(self.numbers, dtype=np.float64), mask
+    elif kind == BOOL:
+      if self.bools is None:
+        return np.zeros(len(self.kinds), dtype=bool), mask
+      return np.frombuffer(self.bools, dtype=np.int8).astype(bool), mask
+    elif kind == STRING:
+      if self.strings is None:
+        return np.full(len(self.kinds), -1, dtype=np.int32), mask
+      return np.frombuffer(self.strings, dtype=np.int32), mask
+    raise ValueError('no typed buffer for column kind {!r}'.format(kind))
+
+  def to_datetime64(self):
+    # Numbers with a date style as datetime64[s], NaT everywhere else
+    import numpy as np
+    from . import convert_dates64
+    if self.numbers is None or self.dates is None:
+      return np.full(len(self.kinds), np.datetime64('NaT'), dtype='M8[s]')
+    values = np.frombuffer(self.numbers, dtype=np.float64)
+    return convert_dates64(np.where(np.frombuffer(self.dates, dtype=np.uint8) != 0, values, np.nan))
+
+
 class Worksheet(object):
-  def __init__(self, name, fp, rels_fp=None, stringtable=None, debug=False):
+  def __init__(self, name, fp, rels_fp=None, stringtable=None, debug=False, header=None, styles=None, instrument=None):
     super(Worksheet, self).__init__()
     self.name = name
-    self._reader = BIFF12Reader(fp=fp, debug=debug)
+    self._instrument = instrument
+    self._reader = BIFF12Reader(fp=fp, debug=debug, instrument=instrument)
     self._rels_fp = rels_fp
     self._rels = ET.parse(rels_fp).getroot() if rels_fp is not None else None
     self._stringtable = stringtable
+    self._styles = styles
     self._data_offset = 0
     self.dimension = None
     self.cols = []
     self.rels = {}
-    self.hyperlinks = {}
-    self._parse()
+    self._hyperlinks = None
+    self._data_end = None
+    self.index = None
+    self._header = header
+    if self._rels is not None:
+      for el in self._rels:
+        self.rels[el.attrib['Id']] = el.attrib['Target']
+    if header:
+      self._load_header()
+    else:
+      self._parse()
 
   def __enter__(self):
     return self
@@ -34,11 +280,14 @@ class Worksheet(object):
   def __iter__(self):
     return self.rows()
 
-  def _parse(self):
-    if self._rels is not None:
-      for el in self._rels:
-        self.rels[el.attrib['Id']] = el.attrib['Target']
+  @property
+  def styles(self):
+    # The workbook can hand over a callable, its styles part then only gets parsed by scans that look at cell formats
+    if callable(self._styles):
+      self._styles = self._styles()
+    return self._styles
 
+  def _parse(self):
     for item in self._reader:
       if item[0] == biff12.DIMENSION:
         self.dimension = item[1]
@@ -46,36 +295,566 @@ class Worksheet(object):
         self.cols.append(item[1])
       elif item[0] == biff12.SHEETDATA:
         self._data_offset = self._reader.tell()
-        if self._rels is None:
+        break
+
+    if self._header is not None:
+      self._save_header()
+
+  @property
+  def hyperlinks(self):
+    # Hyperlink records trail the sheet data, they're only collected the first time someone asks for them
+    if self._hyperlinks is None:
+      self._hyperlinks = self._parse_hyperlinks() if self._rels is not None else RangeIndex()
+    return self._hyperlinks
+
+  def _parse_hyperlinks(self):
+    reader = self._reader
+    # Other scans may be halfway through the sheet, they pick up where they were left
+    pos = reader.tell()
+    if self._data_end is not None:
+      reader.seek(self._data_end, os.SEEK_SET)
+    else:
+      self._seek_row(self.index.rows[-1] if self.index is not None and self.index.complete and self.index.rows else None)
+      while True:
+        recid, reclen, rec = reader.read_record()
+        if recid is None or recid == biff12.SHEETDATA_END:
           break
-      elif item[0] == biff12.HYPERLINK and self._rels is not None:
-        for r in xrange(item[1].h):
-          for c in xrange(item[1].w):
-            self.hyperlinks[item[1].r + r, item[1].c + c] = item[1].rId
+      self._data_end = reader.tell()
+    ranges = []
+    decode = reader.decoder(biff12.HYPERLINK)
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.WORKSHEET_END:
+        break
+      elif recid == biff12.HYPERLINK:
+        link = decode(rec, recid, reclen)
+        ranges.append((link.r, link.c, link.r + link.h - 1, link.c + link.w - 1, link.rId))
+    reader.seek(pos, os.SEEK_SET)
+    return RangeIndex(ranges)
 
-  def rows(self, sparse=False):
+  def _load_header(self):
+    header = self._header
+    self._data_offset = header['data_offset']
+    if header['dimension'] is not None:
+      self.dimension = DimensionHandler.cls._make(header['dimension'])
+    self.cols = [ColumnHandler.cls._make(col) for col in header['cols']]
+    self.index = header.get('index')
     self._reader.seek(self._data_offset, os.SEEK_SET)
-    row_num = -1
+
+  def _save_header(self):
+    # Namedtuples are stored as plain tuples, their classes can't be pickled
+    header = self._header
+    header['data_offset'] = self._data_offset
+    header['dimension'] = tuple(self.dimension) if self.dimension is not None else None
+    header['cols'] = [tuple(col) for col in self.cols]
+    if self.index is not None:
+      header['index'] = self.index
+
+  def build_index(self, step=DEFAULT_STEP):
+    index = RowIndex(step)
+    reader = self._reader
+    reader.seek(self._data_offset, os.SEEK_SET)
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.SHEETDATA_END:
+        break
+      elif recid == biff12.ROW:
+        index.note(rec.read_int(), reader.record_offset)
+    self._data_end = reader.tell()
+    index.complete = True
+    self._set_index(index)
+    return index
+
+  def _set_index(self, index):
+    self.index = index
+    if self._header is not None:
+      self._header['index'] = index
+
+  def _index_row(self, r):
+    # Scans fill in the row index as they go, later seeks can then start close to their target
+    index = self.index
+    if index is None:
+      index = RowIndex()
+      self._set_index(index)
+    if not index.complete:
+      index.note(r, self._reader.record_offset)
+
+  def _seek_row(self, start):
+    # Jumps to the nearest indexed block at or before `start`, falls back to the start of the sheet data
+    offset = None
+    if start is not None and self.index is not None:
+      offset = self.index.lookup(start)[1]
+    self._reader.seek(self._data_offset if offset is None else offset, os.SEEK_SET)
+
+  def _records(self, columns=None):
+    # Same items as iterating the reader, but cells outside `columns` are dropped on their column field alone
+    if columns is None:
+      for item in self._reader:
+        yield item
+      return
+    reader = self._reader
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None:
+        break
+      if recid >= biff12.BLANK and recid <= biff12.FORMULA_BOOLERR:
+        if rec.read_int() not in columns:
+          continue
+        rec.seek(0)
+      decode = reader.decoder(recid)
+      if decode is None:
+        continue
+      ret = decode(rec, recid, reclen)
+      if ret is not None:
+        yield (recid, ret)
+
+  def rows(self, sparse=False, start=None, stop=None, compact=False, columns=None, convert_dates=False, where=None):
+    rows = self._rows(sparse, start, stop, compact, columns, convert_dates, where)
+    if self._instrument is not None:
+      return self._instrument.iterate('rows', rows)
+    return rows
+
+  def _rows(self, sparse, start, stop, compact, columns, convert_dates, where=None):
+    self._seek_row(start)
+    styles = self.styles if convert_dates else None
+    if styles is not None:
+      from . import convert_date
+      dates = {}
+    width = self.dimension.c + self.dimension.w if self.dimension is not None else 0
+    if columns is not None:
+      columns = list(columns)
+      pos = dict((c, i) for i, c in enumerate(columns))
+      blank = lambda r: [Cell(r, c, None) for c in columns]
+    else:
+      pos = None
+      blank = lambda r: [Cell(r, i, None) for i in xrange(width)]
+    row_num = -1 if start is None else start - 1
     row = None
-    for item in self._reader:
+    if self.index is None:
+      self._set_index(RowIndex())
+    if where is not None:
+      # Rows failing the predicates are gaps, those never get padded
+      sparse = True
+      records = self._filtered_records(pos, where, start, stop)
+    else:
+      records = self._records(pos)
+    for item in records:
       if item[0] == biff12.ROW and item[1].r != row_num:
+        if where is None:
+          self._index_row(item[1].r)
         if row is not None:
           yield row
-        if not sparse:
+          row = None
+        if stop is not None and item[1].r >= stop:
+          break
+        if start is not None and item[1].r < start:
+          continue
+        if not sparse and not compact:
           while row_num < item[1].r - 1:
             row_num += 1
-            yield [Cell(row_num, i, None) for i in xrange(self.dimension.c + self.dimension.w)]
+            yield blank(row_num)
         row_num = item[1].r
-        row = [Cell(row_num, i, None) for i in xrange(self.dimension.c + self.dimension.w)]
+        if compact:
+          row = Row(row_num, width)
+        else:
+          row = blank(row_num)
       elif item[0] >= biff12.BLANK and item[0] <= biff12.FORMULA_BOOLERR:
+        if row is None:
+          continue
         if item[0] == biff12.STRING and self._stringtable is not None:
-          row[item[1].c] = Cell(row_num, item[1].c, self._stringtable[item[1].v])
+          v = self._stringtable[item[1].v]
+        elif styles is not None and item[0] in NUMERIC and styles.is_date(item[1].style):
+          v = dates.get(item[1].v)
+          if v is None:
+            v = dates[item[1].v] = convert_date(item[1].v)
+        else:
+          v = item[1].v
+        if compact:
+          if item[0] != biff12.BLANK:
+            row.append(item[1].c, v)
+        elif pos is None:
+          c = item[1].c
+          try:
+            row[c] = Cell(row_num, c, v)
+          except IndexError:
+            # No DIMENSION record (or a cell past it), the row grows with the columns it has
+            row.extend(Cell(row_num, i, None) for i in xrange(len(row), c + 1))
+            row[c] = Cell(row_num, c, v)
         else:
-          row[item[1].c] = Cell(row_num, item[1].c, item[1].v)
+          row[pos[item[1].c]] = Cell(row_num, item[1].c, v)
       elif item[0] == biff12.SHEETDATA_END:
-        if row is not None:
+        # Scans only ever run forward from an indexed row, reaching the end means no block was missed
+        self.index.complete = True
+        self._data_end = self._reader.tell()
+        break
+    if row is not None:
+      yield row
+    if not sparse and not compact and stop is not None:
+      # Rows missing at the end of the range, up to where the sheet ends
+      while row_num < self._range_end(stop) - 1:
+        row_num += 1
+        yield blank(row_num)
+
+  def _filtered_records(self, columns, where, start, stop):
+    # Cells of a row are held back until the row has passed, a failed check skips the rest of the row undecoded
+    checks, required = compile_where(where, self._stringtable)
+    reader = self._reader
+    pending = []
+    row = None
+    row_num = None
+    hits = 0
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None:
+        break
+      elif recid == biff12.ROW:
+        r = rec.read_int()
+        if r == row_num:
+          continue
+        self._index_row(r)
+        if row is not None and hits == required:
+          yield row
+          for item in pending:
+            yield item
+        del pending[:]
+        row = None
+        row_num = r
+        if start is not None and r < start:
+          continue
+        rec.seek(0)
+        item = (recid, reader.decoder(recid)(rec, recid, reclen))
+        if stop is not None and r >= stop:
+          yield item
+          return
+        row = item
+        hits = 0
+      elif recid >= biff12.BLANK and recid <= biff12.FORMULA_BOOLERR:
+        if row is None:
+          continue
+        c = rec.read_int()
+        check = checks.get(c)
+        keep = columns is None or c in columns
+        if check is None and not keep:
+          continue
+        decode = reader.decoder(recid)
+        if decode is None:
+          continue
+        rec.seek(0)
+        cell = decode(rec, recid, reclen)
+        if check is not None:
+          if not check[0](recid, cell.v):
+            row = None
+            del pending[:]
+            continue
+          elif check[1]:
+            hits += 1
+        if keep:
+          pending.append((recid, cell))
+      elif recid == biff12.SHEETDATA_END:
+        if row is not None and hits == required:
           yield row
+          for item in pending:
+            yield item
+        yield (recid, None)
+        return
+
+  def read_range(self, ref, sparse=False):
+    r1, c1, r2, c2 = parse_range(ref)
+    width = self.dimension.c + self.dimension.w if self.dimension is not None else 0
+    columns = None
+    if c1 is not None or c2 is not None:
+      columns = xrange(c1 or 0, (c2 if c2 is not None else width - 1) + 1)
+    stop = r2 + 1 if r2 is not None else None
+    return list(self.rows(sparse=sparse, start=r1, stop=stop, columns=columns))
+
+  def _range_end(self, stop):
+    # Bounded reads get padded up to `stop`, but never past the last row of the sheet's dimension
+    if self.dimension is None:
+      return stop
+    return min(stop, self.dimension.r + self.dimension.h)
+
+  def to_columns(self, columns=None, start=None, stop=None, schema=None):
+    first, last, width = 0, 0, 0
+    if self.dimension is not None:
+      first = self.dimension.r
+      last = self.dimension.r + self.dimension.h
+      width = self.dimension.c + self.dimension.w
+    start = first if start is None else start
+    size = max((last if stop is None else stop) - start, 0)
+    if columns is None:
+      columns = xrange(width)
+    if schema is not None:
+      columns = [field.c for field in schema]
+    selected = dict((c, Column(c, start, size, self._stringtable)) for c in columns)
+    if schema is not None:
+      # Known types get their buffers up front instead of on the first value
+      for field in schema:
+        selected[field.c]._allocate(field.type)
+
+    reader = self._reader
+    styles = self.styles
+    self._seek_row(start)
+    idx = -1
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.SHEETDATA_END:
+        break
+      elif recid == biff12.ROW:
+        row_num = rec.read_int()
+        self._index_row(row_num)
+        if stop is not None and row_num >= stop:
+          break
+        idx = row_num - start if row_num >= start else -1
+      elif recid > biff12.BLANK and recid <= biff12.FORMULA_BOOLERR and idx >= 0 and reader.decoder(recid) is not None:
+        c = rec.read_int()
+        col = selected.get(c)
+        if col is None:
+          continue
+        col._set(idx, recid, rec, styles)
+
+    # Rows past the declared dimension may have grown some columns, keep them all aligned
+    size = max([size] + [len(col.kinds) for col in selected.values()])
+    for col in selected.values():
+      if len(col.kinds) < size:
+        col._resize(size)
+    return selected
+
+  def stats(self, columns=None, start=None, stop=None):
+    # Per column count, nulls, min/max/sum of numbers and approximate distinct values, straight off the records
+    selected = None
+    if columns is not None:
+      selected = dict((column_index(c), None) for c in columns)
+      for c in selected:
+        selected[c] = ColumnAggregate(c)
+    found = {}
+    styles = self.styles
+    reader = self._reader
+    self._seek_row(start)
+    rows = 0
+    row_num = None
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.SHEETDATA_END:
+        break
+      elif recid == biff12.ROW:
+        r = rec.read_int()
+        self._index_row(r)
+        if stop is not None and r >= stop:
+          break
+        if r == row_num or (start is not None and r < start):
+          continue
+        row_num = r
+        rows += 1
+      elif recid >= biff12.BLANK and recid <= biff12.FORMULA_BOOLERR and row_num is not None and reader.decoder(recid) is not None:
+        c = rec.read_int()
+        if selected is not None:
+          agg = selected.get(c)
+          if agg is None:
+            continue
+        else:
+          agg = found.get(c)
+          if agg is None:
+            agg = found[c] = ColumnAggregate(c)
+        agg.add(recid, rec, styles)
+
+    if self.dimension is not None:
+      # Rows missing from the sheet data count as nulls within the declared dimension
+      first = self.dimension.r if start is None else max(start, self.dimension.r)
+      last = self.dimension.r + self.dimension.h if stop is None else min(stop, self.dimension.r + self.dimension.h)
+      rows = max(rows, last - first)
+    aggs = selected if selected is not None else found
+    return OrderedDict((c, aggs[c].summary(rows)) for c in sorted(aggs))
+
+  def infer_schema(self, header=None, sample=None, columns=None):
+    # Record-type histogram per column, values are never decoded except for the header row's names
+    stats = {}
+    names = {}
+    selected = set(columns) if columns is not None else None
+    styles = self.styles
+    reader = self._reader
+    self._seek_row(header)
+    rows = 0
+    row_num = None
+    in_header = False
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.SHEETDATA_END:
+        break
+      elif recid == biff12.ROW:
+        r = rec.read_int()
+        self._index_row(r)
+        if r == row_num:
+          continue
+        row_num = r
+        in_header = header is not None and r == header
+        if header is not None and r <= header:
+          continue
+        if sample is not None and rows >= sample:
+          break
+        rows += 1
+      elif recid > biff12.BLANK and recid <= biff12.FORMULA_BOOLERR and row_num is not None and reader.decoder(recid) is not None:
+        c = rec.read_int()
+        if selected is not None and c not in selected:
+          continue
+        if in_header:
+          rec.seek(0)
+          decode = reader.decoder(recid)
+          v = decode(rec, recid, reclen).v if decode is not None else None
+          if recid == biff12.STRING and self._stringtable is not None:
+            v = self._stringtable[v]
+          names[c] = v if isinstance(v, basestring) else str(v)
+          stats.setdefault(c, ColumnStats())
+          continue
+        if header is not None and row_num < header:
+          continue
+        col = stats.get(c)
+        if col is None:
+          col = stats[c] = ColumnStats()
+        col.counts[recid] += 1
+        if styles is not None and recid in NUMERIC and styles.is_date(rec.read_int()):
+          col.dates += 1
+    return build_schema(stats, rows, names)
+
+  def iter_batches(self, size=DEFAULT_BATCH_SIZE, columns=None, start=None, stop=None, sparse=False, columnar=False, convert_dates=False):
+    if columnar:
+      batches = self._column_batches(size, columns, start, stop)
+      if self._instrument is not None:
+        return self._instrument.iterate('batches', batches)
+      return batches
+    batches = self._tuple_batches(size, columns, start, stop, sparse, convert_dates)
+    if self._instrument is not None:
+      return self._instrument.iterate('rows', batches, len)
+    return batches
+
+  def _tuple_batches(self, size, columns, start, stop, sparse, convert_dates=False):
+    # Rows as plain value tuples, decoded and grouped without going through Cell or the generator per row
+    width = self.dimension.c + self.dimension.w if self.dimension is not None else 0
+    pos = dict((c, i) for i, c in enumerate(columns)) if columns is not None else None
+    if pos is not None:
+      width = len(pos)
+    empty = (None,) * width
+    stringtable = self._stringtable
+    styles = self.styles if convert_dates else None
+    if styles is not None:
+      from . import convert_date
+      dates = {}
+    reader = self._reader
+    self._seek_row(start)
+    row_num = -1 if start is None else start - 1
+    batch = []
+    vals = None
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.SHEETDATA_END:
         break
+      elif recid == biff12.ROW:
+        r = rec.read_int()
+        self._index_row(r)
+        if r == row_num:
+          continue
+        if vals is not None:
+          batch.append(tuple(vals))
+          vals = None
+          if len(batch) >= size:
+            yield batch
+            batch = []
+        if stop is not None and r >= stop:
+          break
+        if start is not None and r < start:
+          continue
+        if not sparse:
+          while row_num < r - 1:
+            row_num += 1
+            batch.append(empty)
+            if len(batch) >= size:
+              yield batch
+              batch = []
+        row_num = r
+        vals = list(empty)
+      elif recid > biff12.BLANK and recid <= biff12.FORMULA_BOOLERR and vals is not None:
+        decode = reader.decoder(recid)
+        if decode is None:
+          continue
+        if pos is not None:
+          i = pos.get(rec.read_int())
+          if i is None:
+            continue
+          rec.seek(0)
+        cell = decode(rec, recid, reclen)
+        if pos is None:
+          i = cell.c
+          if i >= len(vals):
+            vals.extend([None] * (i + 1 - len(vals)))
+        if recid == biff12.STRING and stringtable is not None:
+          vals[i] = stringtable[cell.v]
+        elif styles is not None and recid in NUMERIC and styles.is_date(cell.style):
+          v = dates.get(cell.v)
+          if v is None:
+            v = dates[cell.v] = convert_date(cell.v)
+          vals[i] = v
+        else:
+          vals[i] = cell.v
+    if vals is not None:
+      batch.append(tuple(vals))
+    if not sparse and stop is not None:
+      while row_num < self._range_end(stop) - 1:
+        row_num += 1
+        batch.append(empty)
+        if len(batch) >= size:
+          yield batch
+          batch = []
+    if batch:
+      yield batch
+
+  def _column_batches(self, size, columns, start, stop):
+    # Blocks of `size` row numbers as to_columns() style dicts, blocks without any row are skipped
+    width = self.dimension.c + self.dimension.w if self.dimension is not None else 0
+    if columns is None:
+      columns = xrange(width)
+    columns = list(columns)
+    if stop is None and self.dimension is not None:
+      stop_pad = self.dimension.r + self.dimension.h
+    else:
+      stop_pad = stop
+    styles = self.styles
+    reader = self._reader
+    self._seek_row(start)
+    first = 0 if start is None else start
+    block = None
+    base = None
+    idx = -1
+    while True:
+      recid, reclen, rec = reader.read_record()
+      if recid is None or recid == biff12.SHEETDATA_END:
+        break
+      elif recid == biff12.ROW:
+        r = rec.read_int()
+        self._index_row(r)
+        if stop is not None and r >= stop:
+          break
+        if r < first:
+          idx = -1
+          continue
+        if block is None or r >= base + size:
+          if block is not None:
+            yield self._pad_block(block, size, stop_pad, base)
+          base = first + (r - first) // size * size
+          block = dict((c, Column(c, base, 0, self._stringtable)) for c in columns)
+        idx = r - base
+      elif recid > biff12.BLANK and recid <= biff12.FORMULA_BOOLERR and idx >= 0 and reader.decoder(recid) is not None:
+        col = block.get(rec.read_int())
+        if col is not None:
+          col._set(idx, recid, rec, styles)
+    if block is not None:
+      yield self._pad_block(block, size, stop_pad, base)
+
+  def _pad_block(self, block, size, stop, base):
+    # Blocks are row-aligned and `size` rows long, except for the last one which ends with the sheet
+    size = size if stop is None else min(size, stop - base)
+    for col in block.values():
+      if len(col.kinds) < size:
+        col._resize(size)
+    return block
 
   def close(self):
     self._reader.close()
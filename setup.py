@@ -37,5 +37,15 @@ setup(
     'Programming Language :: Python :: 3.9'
   ],
 
-  packages=['pyxlsb']
+  packages=['pyxlsb'],
+
+  extras_require={
+    'numpy': ['numpy']
+  },
+
+  entry_points={
+    'console_scripts': [
+      'pyxlsb=pyxlsb.export:main'
+    ]
+  }
 )